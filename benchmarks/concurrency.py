@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Measure request throughput as worker threads are added.
+
+A FakeProsperWorks server stands in for ProsperWorks, answering each request
+after a fixed delay. Run with:
+
+    python -m benchmarks.concurrency
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import threading
+import time
+
+import prospyr
+from prospyr.cache import NoOpCache
+from prospyr.connection import _connections
+from prospyr.testing.fake import FakeProsperWorks
+
+
+def run(conn, workers, requests):
+    """
+    GET `requests` people over `workers` threads; return requests/second.
+    """
+    ids = iter(range(requests))
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            with lock:
+                id = next(ids, None)
+            if id is None:
+                return
+            prospyr.Person.objects.use(conn.name).get(id=id % 200 + 1)
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return requests / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='seconds the fake server waits per request')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    fake = FakeProsperWorks(counts={'person': 200}, latency=args.latency)
+    fake.start()
+
+    print('strategy  workers  requests/s')
+    for strategy in ('shared', 'thread'):
+        for workers in args.workers:
+            conn = prospyr.connect(
+                email='bench@example.org', token='token', url=fake.url,
+                name='%s-%s' % (strategy, workers), cache=NoOpCache(),
+                session_strategy=strategy, pool_maxsize=max(args.workers),
+                pool_block=True
+            )
+            rate = run(conn, workers, args.requests)
+            print('{:<8}  {:>7}  {:>10.1f}'.format(strategy, workers, rate))
+            del _connections[conn.name]
+    fake.stop()
+
+
+if __name__ == '__main__':
+    main()
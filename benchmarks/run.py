@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Time Prospyr's hot paths, optionally saving or comparing against a baseline.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --save benchmarks/baselines/0.8.0.json
+    python -m benchmarks.run --compare benchmarks/baselines/0.8.0.json
+
+Baselines depend on the machine and interpreter; compare only against ones
+made in the same environment.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import io
+import json
+import platform
+import sys
+import timeit
+
+import arrow
+
+from benchmarks.suite import benchmarks, setup_connections
+from prospyr.version import VERSION
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """
+    Time `fn`, returning a dict of seconds per call and calls per timing.
+
+    Calls are repeated until one timing takes at least `min_time` seconds;
+    the best and median of `repeat` timings are reported.
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    timings = sorted(timer.repeat(repeat=repeat, number=number))
+    return {
+        'best': timings[0] / number,
+        'median': timings[len(timings) // 2] / number,
+        'number': number,
+    }
+
+
+def run(names, repeat, min_time):
+    setup_connections()
+    results = {}
+    for name in names:
+        results[name] = measure(benchmarks[name](), repeat=repeat,
+                                min_time=min_time)
+        yield name, results[name]
+
+
+def _load(path):
+    with io.open(path, encoding='utf-8') as src:
+        return json.load(src)
+
+
+def _save(path, results):
+    baseline = {
+        'prospyr': '.'.join(str(p) for p in VERSION),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'created': arrow.utcnow().isoformat(),
+        'results': results,
+    }
+    with io.open(path, 'w', encoding='utf-8') as dest:
+        dest.write(json.dumps(baseline, indent=2, sort_keys=True))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', dest='filter', default='',
+                        help='run only benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='least seconds per timing')
+    parser.add_argument('--save', metavar='PATH',
+                        help='save results as a baseline')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='compare results with a saved baseline')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    names = [name for name in benchmarks if args.filter in name]
+    baseline = _load(args.compare)['results'] if args.compare else {}
+
+    print('{:<42} {:>12} {:>12}'.format('benchmark', 'best (ms)',
+                                        'vs baseline' if baseline else ''))
+    results = {}
+    regressions = []
+    for name, result in run(names, args.repeat, args.min_time):
+        results[name] = result
+        ratio = ''
+        if name in baseline:
+            slowdown = result['best'] / baseline[name]['best']
+            ratio = '{:.2f}x'.format(slowdown)
+            if slowdown > args.threshold:
+                ratio += ' !'
+                regressions.append(name)
+        print('{:<42} {:>12.3f} {:>12}'.format(name, result['best'] * 1000,
+                                               ratio))
+
+    if args.save:
+        _save(args.save, results)
+    if regressions:
+        print('\n{n} benchmarks more than {t}x slower than the baseline'
+              .format(n=len(regressions), t=args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+The benchmarks run by benchmarks.run.
+
+Each benchmark is a setup function returning the callable to be timed.
+Requests are answered by a StubSession, so no network is involved.
+
+The suite also runs against past releases, to make their baselines;
+benchmarks of features a release lacks are left out.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+from collections import OrderedDict
+
+from requests import Response, codes
+
+import prospyr
+from prospyr import connection
+from prospyr.cache import InMemoryCache, NoOpCache
+from prospyr.exceptions import MisconfiguredError
+from prospyr.search import ResultSet
+from prospyr.testing import generate
+from tests import load_fixture_json
+
+try:
+    from prospyr.cache import CachedResponse
+except ImportError:  # 0.8.0 and earlier
+    CachedResponse = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+benchmarks = OrderedDict()
+
+resources = OrderedDict([
+    ('person', prospyr.Person),
+    ('company', prospyr.Company),
+    ('opportunity', prospyr.Opportunity),
+    ('activity', prospyr.Activity),
+    ('task', prospyr.Task),
+    ('lead', prospyr.Lead),
+])
+
+
+def benchmark(name, available=True):
+    """
+    Register a benchmark `name`, unless it is not `available`.
+    """
+    def register(setup):
+        if available:
+            benchmarks[name] = setup
+        return setup
+    return register
+
+
+def _response(content):
+    resp = Response()
+    resp._content = content
+    resp.status_code = codes.ok
+    resp.headers['Content-Type'] = 'application/json'
+    return resp
+
+
+class StubSession(object):
+    """
+    Answer search POSTs with `pages` of rows, and list GETs with `lists`.
+
+    Bodies are encoded up front, so only Prospyr's own work is timed.
+    """
+
+    def __init__(self, pages=(), lists=None):
+        self.pages = [json.dumps(page).encode('utf-8') for page in pages]
+        self.lists = {path: body.encode('utf-8')
+                      for path, body in (lists or {}).items()}
+
+    def post(self, url, data=None, **kwargs):
+        # 0.8.0 and earlier post the query unencoded
+        query = kwargs.get('json') or json.loads(data.decode('utf-8'))
+        number = query['page_number']
+        if number > len(self.pages):
+            return _response(b'[]')
+        return _response(self.pages[number - 1])
+
+    def get(self, url, **kwargs):
+        for path, body in self.lists.items():
+            if url.endswith(path):
+                return _response(body)
+        raise ValueError('No stubbed response for GET %s' % url)
+
+
+def setup_connections():
+    """
+    Make the 'default' connection the benchmarks need, if it is missing.
+
+    Nested activity types are read through the default connection.
+    """
+    try:
+        return connection.get('default')
+    except MisconfiguredError:
+        pass
+    conn = prospyr.connect(email='bench@example.org', token='token')
+    conn.session = StubSession(
+        lists={'activity_types': load_fixture_json('activity_types.json')}
+    )
+    return conn
+
+
+def _stub_connection(name, pages):
+    conn = connection._connections.get(name)
+    if conn is None:
+        conn = prospyr.connect(email='bench@example.org', token='token',
+                               name=name, cache=NoOpCache())
+    conn.session = StubSession(pages=pages)
+    return conn
+
+
+def _from_api_data(kind):
+    def setup():
+        resource_cls = resources[kind]
+        rows = generate.rows(kind, 100)
+
+        def run():
+            for row in rows:
+                resource_cls.from_api_data(row)
+        return run
+    return setup
+
+
+def _raw_data(kind):
+    def setup():
+        resource_cls = resources[kind]
+        instances = [resource_cls.from_api_data(row)
+                     for row in generate.rows(kind, 100)]
+
+        def run():
+            for instance in instances:
+                instance._raw_data
+        return run
+    return setup
+
+
+for _kind in resources:
+    benchmark('from_api_data.%s x100' % _kind)(_from_api_data(_kind))
+for _kind in ('person', 'company', 'opportunity', 'task', 'lead'):
+    benchmark('raw_data.%s x100' % _kind)(_raw_data(_kind))
+
+
+@benchmark('cache.set x5000 size=2500')
+def cache_set():
+    keys = ['https://example.org/v1/people/%s/' % i for i in range(5000)]
+
+    def run():
+        cache = InMemoryCache(size=2500)
+        for key in keys:
+            cache.set(key, key)
+    return run
+
+
+@benchmark('cache.get x2500 hits')
+def cache_get():
+    cache = InMemoryCache(size=2500)
+    keys = ['https://example.org/v1/people/%s/' % i for i in range(2500)]
+    for key in keys:
+        cache.set(key, key)
+
+    def run():
+        for key in keys:
+            cache.get(key)
+    return run
+
+
+@benchmark('cache.get_many x2500',
+           available=hasattr(InMemoryCache, 'get_many'))
+def cache_get_many():
+    cache = InMemoryCache(size=2500)
+    keys = ['https://example.org/v1/people/%s/' % i for i in range(2500)]
+    for key in keys:
+        cache.set(key, key)
+
+    def run():
+        cache.get_many(keys)
+    return run
+
+
+@benchmark('cache.set x1000 responses max_bytes=1MB',
+           available=CachedResponse is not None)
+def cache_set_max_bytes():
+    responses = [
+        CachedResponse(status_code=codes.ok, headers={}, body=row,
+                       content=None)
+        for row in generate.rows('person', 1000)
+    ]
+
+    def run():
+        cache = InMemoryCache(max_bytes=2 ** 20)
+        for i, resp in enumerate(responses):
+            cache.set('https://example.org/v1/people/%s/' % i, resp)
+    return run
+
+
+def _result_set(pages, page_size):
+    name = 'bench-pages-%s-%s' % (pages, page_size)
+    rows = generate.rows('person', pages * page_size)
+    _stub_connection(name, [rows[i:i + page_size]
+                            for i in range(0, len(rows), page_size)])
+    return lambda: ResultSet(resource_cls=prospyr.Person, using=name,
+                             page_size=page_size)
+
+
+@benchmark('result_set.iterate 10 pages x100')
+def result_set_iterate():
+    fresh = _result_set(pages=10, page_size=100)
+    return lambda: list(fresh())
+
+
+@benchmark('result_set.iterate 100 pages x10')
+def result_set_small_pages():
+    fresh = _result_set(pages=100, page_size=10)
+    return lambda: list(fresh())
+
+
+@benchmark('result_set.stream 10 pages x100',
+           available=hasattr(ResultSet, 'stream'))
+def result_set_stream():
+    fresh = _result_set(pages=10, page_size=100)
+    return lambda: list(fresh().stream())
+
+
+@benchmark('result_set.to_columns 10 pages x100',
+           available=numpy is not None and hasattr(ResultSet, 'to_columns'))
+def result_set_to_columns():
+    fresh = _result_set(pages=10, page_size=100)
+    return lambda: fresh().to_columns()
+
+
+@benchmark('lazy_list.index 0..199 in turn')
+def lazy_list_index():
+    fresh = _result_set(pages=2, page_size=100)
+
+    def run():
+        results = fresh()
+        for i in range(200):
+            results[i]
+    return run
+
+
+@benchmark('lazy_list.slice [100:200]')
+def lazy_list_slice():
+    fresh = _result_set(pages=2, page_size=100)
+    return lambda: fresh()[100:200]
+
+
+@benchmark('lazy_list.iterate twice')
+def lazy_list_iterate_twice():
+    fresh = _result_set(pages=2, page_size=100)
+
+    def run():
+        results = fresh()
+        list(results)
+        list(results)
+    return run
+
+
+@benchmark('lazy_list.repr')
+def lazy_list_repr():
+    fresh = _result_set(pages=2, page_size=100)
+    return lambda: repr(fresh())
@@ -9,4 +9,6 @@ from prospyr.resources import (Account, Activity, ActivityType, Company,
                                CustomerSource, Identifier, Lead, LossReason,
                                Opportunity, Person, Pipeline, PipelineStage,
                                Task, User, Webhook)
+from prospyr.testing.budget import assert_max_requests
 from prospyr.version import VERSION
+from prospyr.warmup import warm
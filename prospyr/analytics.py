@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorised pipeline analytics over Opportunities.
+
+Opportunity search results are streamed page by page into NumPy columns (see
+ResultSet.to_columns), then aggregated without a Python loop over rows:
+
+    columns = analytics.opportunity_columns()
+    by_stage = analytics.grouped(columns, 'pipeline_stage_id')
+    forecast = analytics.weighted_forecast(columns, by='assignee_id')
+    counts, days = analytics.inactivity_histogram(columns)
+
+NumPy must be installed.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import time
+from collections import namedtuple
+
+from prospyr.columns import Categorical, require
+
+# the Opportunity fields the analytics use
+analytics_columns = ('id', 'monetary_value', 'win_probability',
+                     'pipeline_stage_id', 'assignee_id', 'stage',
+                     'close_date', 'date_created', 'date_modified')
+
+# days since last modified, as histogram bin edges
+default_inactivity_bins = (0, 7, 14, 30, 60, 90, 180, 365, float('inf'))
+
+
+class Grouped(namedtuple('Grouped', 'keys,count,sum,mean')):
+    """
+    Aggregates of a value by group: one array element per key.
+    """
+    __slots__ = ()
+
+    def as_dict(self):
+        """
+        {key: (count, sum, mean)}, for display.
+        """
+        return {
+            key: (int(count), float(sum_), float(mean))
+            for key, count, sum_, mean in zip(self.keys.tolist(), self.count,
+                                              self.sum, self.mean)
+        }
+
+
+def opportunity_columns(results=None, using='default'):
+    """
+    Fetch the columns used by these analytics from `results`, by default all
+    Opportunities.
+    """
+    if results is None:
+        from prospyr.resources import Opportunity
+        results = Opportunity.objects.use(using).all()
+    return results.to_columns(columns=list(analytics_columns))
+
+
+def grouped(columns, by, value='monetary_value', stages=None):
+    """
+    Count, sum and mean `value` by column `by`, e.g. 'pipeline_stage_id'.
+
+    Only Opportunities in `stages`, if argued, are included. Rows missing the
+    key or the value are left out.
+    """
+    np = require('numpy')
+    values = np.asarray(columns[value], dtype=np.float64)
+    return _group(np, columns[by], values, _stage_mask(np, columns, stages))
+
+
+def weighted_forecast(columns, by=None, stages=('Open', )):
+    """
+    Sum monetary_value weighted by win_probability, in total or by column
+    `by`.
+
+    By default only open Opportunities are forecast. Returns a float in
+    total, otherwise Grouped weighted sums and means.
+    """
+    np = require('numpy')
+    values = np.asarray(columns['monetary_value'], dtype=np.float64)
+    weights = np.asarray(columns['win_probability'], dtype=np.float64) / 100
+    weighted = values * weights
+    keep = _stage_mask(np, columns, stages)
+    if by is None:
+        return float(np.nansum(weighted[keep]))
+    return _group(np, columns[by], weighted, keep)
+
+
+def inactivity_histogram(columns, now=None, bins=default_inactivity_bins,
+                         stages=('Open', )):
+    """
+    Histogram days since Opportunities were last modified.
+
+    `now` is seconds since the epoch, by default the current time. Returns
+    the counts and bin edges, as numpy.histogram does.
+    """
+    np = require('numpy')
+    now = np.datetime64(int(time.time() if now is None else now), 's')
+    modified = columns['date_modified']
+    keep = _stage_mask(np, columns, stages) & ~np.isnat(modified)
+    seconds = (now - modified[keep]).astype(np.float64)
+    return np.histogram(seconds / 86400, bins=np.asarray(bins))
+
+
+def _stage_mask(np, columns, stages):
+    """
+    A boolean array selecting rows whose stage is one of `stages`, or all
+    rows if `stages` is None.
+    """
+    stage = columns['stage']
+    if stages is None:
+        return np.ones(len(stage.codes), dtype=bool)
+    codes = [code for code, name in enumerate(stage.categories)
+             if name in stages]
+    return np.isin(stage.codes, codes)
+
+
+def _group(np, keys, values, keep):
+    keep = keep & ~np.isnan(values)
+    labels = None
+    if isinstance(keys, Categorical):
+        labels = np.array(keys.categories, dtype=object)
+        keys = keys.codes
+        keep &= keys >= 0
+    elif keys.dtype.kind == 'f':
+        keep &= ~np.isnan(keys)
+
+    unique, inverse = np.unique(keys[keep], return_inverse=True)
+    count = np.bincount(inverse, minlength=len(unique))
+    total = np.bincount(inverse, weights=values[keep], minlength=len(unique))
+    mean = total / np.maximum(count, 1)
+
+    if labels is not None:
+        unique = labels[unique]
+    elif unique.dtype.kind == 'f':
+        # ids had gaps, so were stored as floats
+        unique = unique.astype(np.int64)
+    return Grouped(unique, count, total, mean)
@@ -1,79 +1,314 @@
 # -*- coding: utf-8 -*-
 
-from __future__ import absolute_import, print_function, unicode_literals
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
 
-from collections import namedtuple
+import heapq
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
 from logging import getLogger
 
 import arrow
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from prospyr.tracing import get_tracer
+from prospyr.util import url_template
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # python 2
+    from collections import Mapping
 
 logger = getLogger(__name__)
 CacheEntry = namedtuple('CacheEntry', 'value,created,max_age')
 
+# the only response headers worth keeping once a response is cached.
+_kept_headers = ('Content-Type', 'Date', 'ETag', 'Last-Modified')
+
 
-class InMemoryCache(object):
+def approximate_size(value):
     """
-    An in-memory cache. Keys are expired by count and age.
+    Approximate bytes of memory used by `value` and everything it contains.
+
+    Objects shared with other values are counted in full.
     """
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        for key, item in value.items():
+            size += approximate_size(key) + approximate_size(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += approximate_size(item)
+    return size
 
-    def __init__(self, size=500):
-        self._cache = {}
-        self._size = size
+
+class CacheStats(object):
+    """
+    Counters describing how well a cache is doing.
+
+    Hits and misses are also counted per URL template (e.g. people/{id}/).
+    Counting is cheap enough to leave on in production.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self._patterns = {}
+
+    def hit(self, key):
+        self.hits += 1
+        self._pattern(key)[0] += 1
+
+    def miss(self, key):
+        self.misses += 1
+        self._pattern(key)[1] += 1
+
+    def _pattern(self, key):
+        pattern = url_template(key)
+        counts = self._patterns.get(pattern)
+        if counts is None:
+            counts = self._patterns.setdefault(pattern, [0, 0])
+        return counts
+
+    @staticmethod
+    def _ratio(hits, misses):
+        total = hits + misses
+        return hits / total if total else None
+
+    def as_dict(self, entries=None, nbytes=None):
+        patterns = {
+            pattern: {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': self._ratio(hits, misses),
+            }
+            for pattern, (hits, misses) in list(self._patterns.items())
+        }
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self._ratio(self.hits, self.misses),
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': nbytes,
+            'patterns': patterns,
+        }
+
+
+class BaseCache(object):
+    """
+    The interface every cache must provide.
+
+    Keys are strings. get() returns None for missing or expired keys, and
+    meta() raises KeyError. A max_age of 0 never expires. Subclasses must
+    implement meta(), set(), get() and clear(); the bulk methods loop over
+    these unless overridden with something cheaper, and touch() does nothing
+    unless overridden. Subclasses should count hits, misses, expirations and
+    evictions on self._stats.
+    """
+
+    def __init__(self):
+        self._stats = CacheStats()
+
+    def stats(self):
+        """
+        A dict of counters suitable for exporting as metrics.
+
+        Includes hits, misses, hit_ratio, expirations, evictions, current
+        entries and approximate bytes, plus hits, misses and hit_ratio per URL
+        template under `patterns`. Values which a cache cannot know are None.
+        """
+        return self._stats.as_dict()
 
     def meta(self, key):
-        return self._cache[key]
+        raise NotImplementedError()
+
+    def set(self, key, value, max_age=0):
+        raise NotImplementedError()
+
+    def get(self, key):
+        raise NotImplementedError()
+
+    def clear(self, key):
+        raise NotImplementedError()
+
+    def touch(self, key):
+        """
+        Mark `key` as used, so it is among the last to be evicted, without
+        counting a hit or miss.
+        """
+
+    def get_many(self, keys):
+        """
+        Return a dict of those `keys` which are cached.
+        """
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, mapping, max_age=0):
+        """
+        Cache every key and value in `mapping`.
+        """
+        for key, value in mapping.items():
+            self.set(key, value, max_age=max_age)
+        return True
+
+    def _count(self, keys, found):
+        for key in keys:
+            if key in found:
+                self._stats.hit(key)
+            else:
+                self._stats.miss(key)
+
+
+class InMemoryCache(BaseCache):
+    """
+    An in-memory cache. Keys are expired by count, approximate size and age.
+
+    By default up to 500 keys are kept. Argue `max_bytes` to bound the cache
+    by the approximate memory used by its values instead, or as well if
+    `size` is also argued. Least recently used keys are evicted first. The
+    cache is safe to share between threads.
+    """
+
+    def __init__(self, size=None, max_bytes=None):
+        super(InMemoryCache, self).__init__()
+        self._cache = OrderedDict()
+        self._sizes = {}
+        self._nbytes = 0
+        # (expiry time, key) of keys with a max_age, soonest first. Items for
+        # keys since replaced or removed are skipped when they come up.
+        self._expiries = []
+        self._lock = threading.Lock()
+        self._size = 500 if size is None and max_bytes is None else size
+        self._max_bytes = max_bytes
+
+    def meta(self, key):
+        with self._lock:
+            entry = self._live(key, arrow.utcnow().timestamp)
+        if entry is None:
+            raise KeyError(key)
+        return entry
 
     def set(self, key, value, max_age=0):
         now = arrow.utcnow().timestamp
         entry = CacheEntry(value=value, created=now, max_age=max_age)
-        logger.debug('%s added to cache', key)
-        self._cache[key] = entry
-        self._maintenance()
+        size = approximate_size(value)
+        with self._lock:
+            self._remove(key)
+            if self._max_bytes is not None and size > self._max_bytes:
+                # storing it would evict everything else, then itself
+                logger.debug('%s is too large to cache', key)
+                self._stats.evictions += 1
+                return True
+            logger.debug('%s added to cache', key)
+            self._cache[key] = entry
+            self._sizes[key] = size
+            self._nbytes += size
+            if max_age:
+                heapq.heappush(self._expiries, (now + max_age, key))
+            self._maintenance(now)
         return True
 
     def get(self, key):
-        self._maintenance()
-        try:
-            entry = self._cache[key]
+        with self._lock:
+            entry = self._live(key, arrow.utcnow().timestamp)
+            if entry is None:
+                logger.debug('Cache miss for %s', key)
+                self._stats.miss(key)
+                return None
+            # re-insert to mark as most recently used
+            del self._cache[key]
+            self._cache[key] = entry
             logger.debug('Cache hit for %s', key)
+            self._stats.hit(key)
             return entry.value
-        except KeyError:
-            logger.debug('Cache miss for %s', key)
-            return None
+
+    def touch(self, key):
+        with self._lock:
+            entry = self._cache.pop(key, None)
+            if entry is not None:
+                self._cache[key] = entry
 
     def clear(self, key):
-        if key in self._cache:
-            logger.debug('Cleared %s', key)
-            self._cache.pop(key)
+        with self._lock:
+            if key in self._cache:
+                logger.debug('Cleared %s', key)
+                self._remove(key)
         return True
 
-    def _maintenance(self):
-        # expire any keys older than max_age
-        to_expire = []
-        now = arrow.utcnow().timestamp
-        for key, entry in self._cache.items():
-            too_old = (
-                entry.max_age and
-                entry.created + entry.max_age <= now
-            )
-            if too_old:
-                to_expire.append(key)
-        for key in to_expire:
+    def _live(self, key, now):
+        """
+        The entry for `key`, or None if it is missing or has expired.
+        """
+        entry = self._cache.get(key)
+        if entry is not None and self._expired(entry, now):
             logger.debug('%s has expired', key)
-            del self._cache[key]
+            self._remove(key)
+            self._stats.expirations += 1
+            return None
+        return entry
+
+    @staticmethod
+    def _expired(entry, now):
+        return entry.max_age and entry.created + entry.max_age <= now
+
+    def _remove(self, key):
+        self._cache.pop(key, None)
+        self._nbytes -= self._sizes.pop(key, 0)
 
-        # if too many keys, repeatedly expire oldest
-        excess_size = len(self._cache) - self._size
-        if excess_size > 0:
-            key_ages = [(created, key)
-                        for key, (_, created, _) in self._cache.items()]
-            key_ages = sorted(key_ages)
-            for _, key in key_ages[:excess_size]:
-                logger.debug('Cache too full, evicted %s', key)
-                del self._cache[key]
+    def _too_full(self):
+        return (
+            (self._size is not None and len(self._cache) > self._size) or
+            (self._max_bytes is not None and self._nbytes > self._max_bytes)
+        )
 
+    def _maintenance(self, now):
+        # expire keys whose max_age has passed, soonest first
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= now:
+            expires, key = heapq.heappop(expiries)
+            entry = self._cache.get(key)
+            if entry is not None and self._expired(entry, now):
+                logger.debug('%s has expired', key)
+                self._remove(key)
+                self._stats.expirations += 1
 
-class NoOpCache(object):
+        # if too many keys or bytes, repeatedly expire least recently used
+        while self._cache and self._too_full():
+            key = next(iter(self._cache))
+            logger.debug('Cache too full, evicted %s', key)
+            self._remove(key)
+            self._stats.evictions += 1
+
+        # forget items for replaced and evicted keys once they pile up
+        if len(expiries) > 2 * len(self._cache) + 64:
+            self._expiries = [(entry.created + entry.max_age, key)
+                              for key, entry in self._cache.items()
+                              if entry.max_age]
+            heapq.heapify(self._expiries)
+
+    def stats(self):
+        with self._lock:
+            return self._stats.as_dict(entries=len(self._cache),
+                                       nbytes=self._nbytes)
+
+
+class NoOpCache(BaseCache):
     """
     A cache class which doesn't cache anything.
     """
@@ -85,7 +320,365 @@ class NoOpCache(object):
         return True
 
     def get(self, key):
+        self._stats.miss(key)
         return None
 
     def clear(self, key):
         return True
+
+    def get_many(self, keys):
+        for key in keys:
+            self._stats.miss(key)
+        return {}
+
+    def set_many(self, mapping, max_age=0):
+        return True
+
+
+class CachedResponse(namedtuple('CachedResponse',
+                                'status_code,headers,body,content')):
+    """
+    The parts of a requests.Response worth caching.
+
+    JSON bodies are decoded once, when the record is made; json() returns that
+    same decoded body on every call, so callers must not mutate it. Other
+    bodies are kept as raw bytes in `content`. Only a few headers are kept.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_response(cls, resp, loads=None):
+        """
+        Make a record of `resp`, decoding JSON with `loads` if argued.
+        """
+        with get_tracer().start_as_current_span('prospyr.json_decode') as span:
+            if span.is_recording():
+                span.set_attribute('prospyr.bytes', len(resp.content))
+            try:
+                body = resp.json() if loads is None else loads(resp.content)
+                content = None
+            except ValueError:
+                body, content = None, resp.content
+        headers = CaseInsensitiveDict()
+        for name in _kept_headers:
+            value = resp.headers.get(name)
+            if value is not None:
+                headers[name] = value
+        return cls(status_code=resp.status_code, headers=headers, body=body,
+                   content=content)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        if self.content is None:
+            return json.dumps(self.body)
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        if self.content is not None:
+            raise ValueError('Response body is not JSON')
+        return self.body
+
+
+def dumps(value):
+    """
+    Serialise a cacheable `value` to compact bytes.
+
+    Responses are stored as their CachedResponse, with the body compressed.
+    Anything else must be JSON-serialisable.
+    """
+    if isinstance(value, Response):
+        value = CachedResponse.from_response(value)
+    if isinstance(value, CachedResponse):
+        is_json = value.content is None
+        meta = {
+            'status_code': value.status_code,
+            'headers': dict(value.headers),
+            'json': is_json,
+        }
+        meta = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        body = (json.dumps(value.body, separators=(',', ':')).encode('utf-8')
+                if is_json else value.content)
+        return b''.join((b'C', struct.pack('>I', len(meta)), meta,
+                         zlib.compress(body)))
+    return b'J' + json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """
+    Reverse of dumps().
+    """
+    data = bytes(data)
+    tag, data = data[:1], data[1:]
+    if tag == b'C':
+        size, = struct.unpack('>I', data[:4])
+        meta = json.loads(data[4:4 + size].decode('utf-8'))
+        body = zlib.decompress(data[4 + size:])
+        if meta['json']:
+            body, content = json.loads(body.decode('utf-8')), None
+        else:
+            body, content = None, body
+        return CachedResponse(status_code=meta['status_code'],
+                              headers=CaseInsensitiveDict(meta['headers']),
+                              body=body, content=content)
+    elif tag == b'J':
+        return json.loads(data.decode('utf-8'))
+    raise ValueError('Unknown cache serialisation %r' % tag)
+
+
+class SqliteCache(BaseCache):
+    """
+    A cache stored in an SQLite database at `path`.
+
+    The database can be shared by any number of processes on one host. Keys
+    are expired by count, total size in bytes and age. Values are stored
+    serialised, so each get() returns a fresh copy.
+    """
+
+    # totals are kept by triggers, so limits are checked without a scan.
+    _schema = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            created REAL NOT NULL,
+            max_age REAL NOT NULL,
+            expires REAL,
+            nbytes INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+        CREATE INDEX IF NOT EXISTS cache_created ON cache (created);
+        CREATE TABLE IF NOT EXISTS cache_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            entries INTEGER NOT NULL,
+            nbytes INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO cache_totals (id, entries, nbytes)
+            SELECT 0, COUNT(*), COALESCE(SUM(nbytes), 0) FROM cache;
+        CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache
+        BEGIN
+            UPDATE cache_totals SET entries = entries + 1,
+                                    nbytes = nbytes + NEW.nbytes
+            WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache
+        BEGIN
+            UPDATE cache_totals SET entries = entries - 1,
+                                    nbytes = nbytes - OLD.nbytes
+            WHERE id = 0;
+        END;
+    """
+
+    def __init__(self, path, size=500, max_bytes=None, timeout=10):
+        super(SqliteCache, self).__init__()
+        self._path = path
+        self._size = size
+        self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._local = threading.local()
+        with self._db() as db:
+            db.executescript(self._schema)
+
+    def _db(self):
+        # sqlite connections must not cross threads or forks.
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self._path, timeout=self._timeout)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            # fire the delete trigger for rows replaced by INSERT OR REPLACE
+            db.execute('PRAGMA recursive_triggers=ON')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def meta(self, key):
+        row = self._db().execute(
+            'SELECT value, created, max_age FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, arrow.utcnow().timestamp)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        value, created, max_age = row
+        return CacheEntry(value=loads(value), created=created,
+                          max_age=max_age)
+
+    def set(self, key, value, max_age=0):
+        now = arrow.utcnow().timestamp
+        expires = now + max_age if max_age else None
+        data = sqlite3.Binary(dumps(value))
+        if self._max_bytes is not None and len(data) > self._max_bytes:
+            # storing it would evict everything else, then itself
+            logger.debug('%s is too large to cache', key)
+            self.clear(key)
+            self._stats.evictions += 1
+            return True
+        with self._db() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO cache '
+                '(key, value, created, max_age, expires, nbytes) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, data, now, max_age, expires, len(data))
+            )
+            self._maintenance(db, now)
+        logger.debug('%s added to cache', key)
+        return True
+
+    def get(self, key):
+        try:
+            value = self.meta(key).value
+            logger.debug('Cache hit for %s', key)
+            self._stats.hit(key)
+            return value
+        except KeyError:
+            logger.debug('Cache miss for %s', key)
+            self._stats.miss(key)
+            return None
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self._db().execute(
+            'SELECT key, value FROM cache WHERE key IN ({params}) '
+            'AND (expires IS NULL OR expires > ?)'.format(
+                params=', '.join('?' * len(keys))),
+            keys + [arrow.utcnow().timestamp]
+        )
+        found = {key: loads(value) for key, value in rows}
+        self._count(keys, found)
+        return found
+
+    def touch(self, key):
+        # keys are evicted oldest first
+        with self._db() as db:
+            db.execute('UPDATE cache SET created = ? WHERE key = ?',
+                       (arrow.utcnow().timestamp, key))
+
+    def clear(self, key):
+        with self._db() as db:
+            db.execute('DELETE FROM cache WHERE key = ?', (key, ))
+        logger.debug('Cleared %s', key)
+        return True
+
+    def stats(self):
+        """
+        As BaseCache.stats(). Counters are for this process only, while
+        entries and bytes are for the whole database.
+        """
+        entries, nbytes = self._db().execute(
+            'SELECT entries, nbytes FROM cache_totals'
+        ).fetchone()
+        return self._stats.as_dict(entries=entries, nbytes=nbytes)
+
+    def _maintenance(self, db, now):
+        expired = db.execute('DELETE FROM cache WHERE expires <= ?', (now, ))
+        self._stats.expirations += max(expired.rowcount, 0)
+
+        # if too many keys or bytes, repeatedly expire oldest
+        count, nbytes = db.execute(
+            'SELECT entries, nbytes FROM cache_totals'
+        ).fetchone()
+        excess_size = count - self._size
+        excess_bytes = (nbytes - self._max_bytes
+                        if self._max_bytes is not None else 0)
+        if excess_size <= 0 and excess_bytes <= 0:
+            return
+
+        to_evict = []
+        rows = db.execute('SELECT key, nbytes FROM cache ORDER BY created')
+        for key, entry_bytes in rows:
+            if excess_size <= 0 and excess_bytes <= 0:
+                break
+            to_evict.append((key, ))
+            excess_size -= 1
+            excess_bytes -= entry_bytes
+        logger.debug('Cache too full, evicted %s keys', len(to_evict))
+        db.executemany('DELETE FROM cache WHERE key = ?', to_evict)
+        self._stats.evictions += len(to_evict)
+
+
+class RedisCache(BaseCache):
+    """
+    A cache stored in Redis, shared by every host which can reach it.
+
+    `client` is a redis.StrictRedis instance or anything with the same
+    get, mget, set, delete and pipeline methods. Keys are namespaced with
+    `prefix`. Redis expires keys itself; bound its memory with the server's
+    maxmemory setting. For the same reason, stats() cannot count expirations,
+    evictions, entries or bytes; ask the Redis server's INFO instead.
+    """
+
+    # created and max_age precede the serialised value
+    _header = struct.Struct('>dd')
+
+    def __init__(self, client, prefix='prospyr:'):
+        super(RedisCache, self).__init__()
+        self._client = client
+        self._prefix = prefix
+
+    def _key(self, key):
+        return '{prefix}{key}'.format(prefix=self._prefix, key=key)
+
+    def _pack(self, value, max_age):
+        now = arrow.utcnow().timestamp
+        return self._header.pack(now, max_age) + dumps(value)
+
+    def _unpack(self, data):
+        created, max_age = self._header.unpack(data[:self._header.size])
+        value = loads(data[self._header.size:])
+        return CacheEntry(value=value, created=created, max_age=max_age)
+
+    @staticmethod
+    def _expiry(max_age):
+        # redis wants whole milliseconds, and no expiry rather than 0.
+        return int(max_age * 1000) or None
+
+    def meta(self, key):
+        data = self._client.get(self._key(key))
+        if data is None:
+            raise KeyError(key)
+        return self._unpack(data)
+
+    def set(self, key, value, max_age=0):
+        self._client.set(self._key(key), self._pack(value, max_age),
+                         px=self._expiry(max_age))
+        logger.debug('%s added to cache', key)
+        return True
+
+    def get(self, key):
+        try:
+            value = self.meta(key).value
+            logger.debug('Cache hit for %s', key)
+            self._stats.hit(key)
+            return value
+        except KeyError:
+            logger.debug('Cache miss for %s', key)
+            self._stats.miss(key)
+            return None
+
+    def clear(self, key):
+        self._client.delete(self._key(key))
+        logger.debug('Cleared %s', key)
+        return True
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        datas = self._client.mget([self._key(key) for key in keys])
+        found = {key: self._unpack(data).value
+                 for key, data in zip(keys, datas) if data is not None}
+        self._count(keys, found)
+        return found
+
+    def set_many(self, mapping, max_age=0):
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(self._key(key), self._pack(value, max_age),
+                     px=self._expiry(max_age))
+        pipe.execute()
+        return True
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+JSON codecs encode request bodies and decode response bodies.
+
+Argue codec='orjson' or codec='ujson' to connect() to use those libraries,
+if installed, or any object with the methods of JSONCodec.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+
+from six import string_types
+
+from prospyr.exceptions import MisconfiguredError
+
+
+class JSONCodec(object):
+    """
+    Encode and decode JSON with the standard library.
+
+    loads() takes UTF-8 bytes, and dumps() returns them.
+    """
+
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data.decode('utf-8'))
+
+    def dumps(self, value):
+        return json.dumps(value, separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+
+
+class OrjsonCodec(JSONCodec):
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+    def dumps(self, value):
+        return self._orjson.dumps(value)
+
+
+class UjsonCodec(JSONCodec):
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+    def dumps(self, value):
+        return self._ujson.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+codecs = {codec.name: codec for codec in (JSONCodec, OrjsonCodec, UjsonCodec)}
+
+
+def get_codec(codec=None):
+    """
+    Return a codec given its name, a codec instance, or None for JSONCodec.
+    """
+    if codec is None:
+        return JSONCodec()
+    if not isinstance(codec, string_types):
+        return codec
+    if codec not in codecs:
+        raise MisconfiguredError('codec must be one of %s, or a codec'
+                                 % ', '.join(sorted(codecs)))
+    try:
+        return codecs[codec]()
+    except ImportError:
+        raise MisconfiguredError('The %s codec needs the %s package, which '
+                                 'is not installed' % (codec, codec))
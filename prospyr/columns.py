@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Typed column arrays built straight from search result rows.
+
+Columns are chosen and typed by a resource's schema: integers become int64
+(float64 if any are missing), Unix timestamps datetime64[s], strings limited
+to a few choices (e.g. Opportunity.stage) categoricals, and other strings
+object arrays. Nested and list fields are left out unless asked for by name.
+
+NumPy is needed to build columns, and pandas to build DataFrames.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from collections import OrderedDict, namedtuple
+
+from marshmallow import fields
+from marshmallow.validate import OneOf
+
+from prospyr.exceptions import MisconfiguredError
+from prospyr.fields import Unix
+
+
+class Categorical(namedtuple('Categorical', 'codes,categories')):
+    """
+    A categorical column: int8 `codes` indexing a list of `categories`.
+
+    Missing values have code -1, as with pandas.Categorical.
+    """
+    __slots__ = ()
+
+    def values(self):
+        """
+        An object array of the column's values.
+        """
+        np = require('numpy')
+        categories = np.array(list(self.categories) + [None], dtype=object)
+        return categories[self.codes]
+
+
+def require(name):
+    """
+    Import optional dependency `name`, or raise MisconfiguredError.
+    """
+    try:
+        return __import__(name)
+    except ImportError:
+        raise MisconfiguredError('Building columns needs the %s package, '
+                                 'which is not installed' % name)
+
+
+def _kind(field):
+    if isinstance(field, Unix):
+        return 'datetime'
+    if isinstance(field, fields.Integer):
+        return 'int'
+    if isinstance(field, (fields.Float, fields.Decimal)):
+        return 'float'
+    if isinstance(field, fields.Boolean):
+        return 'bool'
+    if isinstance(field, fields.String):
+        if any(isinstance(v, OneOf) for v in field.validators):
+            return 'category'
+        return 'string'
+    return None
+
+
+class ColumnBuilder(object):
+    """
+    Accumulate pages of rows of `resource_cls` into typed columns.
+
+    Each page's values are converted to an array as the page is added, so
+    rows need not be kept; the arrays are joined by columns().
+    """
+
+    def __init__(self, resource_cls, columns=None):
+        self._np = require('numpy')
+        schema_fields = resource_cls.Meta.schema.fields
+        names = sorted(schema_fields, key=lambda name: (name != 'id', name))
+        self._kinds = OrderedDict()
+        self._keys = {}
+        for name in (names if columns is None else columns):
+            if name not in schema_fields:
+                raise ValueError('%s has no field `%s`'
+                                 % (resource_cls.__name__, name))
+            field = schema_fields[name]
+            kind = _kind(field)
+            if kind is None and columns is None:
+                continue
+            self._kinds[name] = kind or 'object'
+            self._keys[name] = getattr(field, 'load_from', None) or name
+        self._categories = {}
+        for name, kind in self._kinds.items():
+            if kind == 'category':
+                choices = [v.choices for v in schema_fields[name].validators
+                           if isinstance(v, OneOf)][0]
+                self._categories[name] = OrderedDict(
+                    (choice, code) for code, choice in enumerate(choices))
+        self._chunks = {name: [] for name in self._kinds}
+        self.rows = 0
+
+    def add_page(self, rows):
+        for name in self._kinds:
+            key = self._keys[name]
+            values = [row.get(key) for row in rows]
+            self._chunks[name].append(self._array(name, values))
+        self.rows += len(rows)
+
+    def columns(self):
+        """
+        Return an OrderedDict of column name to array or Categorical.
+        """
+        columns = OrderedDict()
+        for name in self._kinds:
+            chunks = self._chunks[name] or [self._array(name, [])]
+            array = self._np.concatenate(chunks)
+            if name in self._categories:
+                array = Categorical(array, list(self._categories[name]))
+            columns[name] = array
+        return columns
+
+    def _array(self, name, values):
+        kind = self._kinds[name]
+        if kind == 'category':
+            return self._category_array(values, self._categories[name])
+        return getattr(self, '_%s_array' % kind)(values)
+
+    def _int_array(self, values):
+        np = self._np
+        if None in values:
+            return self._float_array(values)
+        return np.array(values, dtype=np.int64)
+
+    def _float_array(self, values):
+        np = self._np
+        return np.array([np.nan if v is None else v for v in values],
+                        dtype=np.float64)
+
+    def _datetime_array(self, values):
+        np = self._np
+        nat = np.iinfo(np.int64).min
+        array = np.array([nat if v is None else v for v in values],
+                         dtype=np.int64)
+        return array.view('datetime64[s]')
+
+    def _bool_array(self, values):
+        if None in values:
+            return self._object_array(values)
+        return self._np.array(values, dtype=bool)
+
+    def _category_array(self, values, categories):
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = categories.get(value)
+            if code is None:
+                # a value the schema does not know; keep it all the same
+                code = categories[value] = len(categories)
+            codes.append(code)
+        dtype = self._np.int8 if len(categories) < 128 else self._np.int32
+        return self._np.array(codes, dtype=dtype)
+
+    def _string_array(self, values):
+        return self._object_array(values)
+
+    def _object_array(self, values):
+        array = self._np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            array[i] = value
+        return array
+
+
+def to_dataframe(columns):
+    """
+    A pandas.DataFrame of `columns`, as returned by ColumnBuilder.columns().
+    """
+    pd = require('pandas')
+    data = OrderedDict()
+    for name, column in columns.items():
+        if isinstance(column, Categorical):
+            column = pd.Categorical.from_codes(column.codes,
+                                               column.categories)
+        data[name] = column
+    return pd.DataFrame(data, columns=list(data))
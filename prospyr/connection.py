@@ -3,21 +3,36 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
 import functools
+import json
 import re
+import threading
+import time
+from logging import getLogger
+from uuid import uuid4
 
 import requests
+from requests import codes
+from requests.adapters import HTTPAdapter
 from urlobject import URLObject
 from urlobject.path import URLPath
 
-from prospyr.cache import InMemoryCache
-from prospyr.exceptions import MisconfiguredError
+from prospyr.cache import CachedResponse, InMemoryCache, NoOpCache
+from prospyr.codec import get_codec
+from prospyr.deadline import Deadline
+from prospyr.exceptions import DeadlineExceeded, MisconfiguredError
+from prospyr.identity import IdentityMap
+from prospyr.instrument import RequestEvent
+from prospyr.nplusone import NPlusOneDetector
+from prospyr.transport import Transport
 from prospyr.util import seconds
 
+logger = getLogger(__name__)
+
 _connections = {}
 _default_url = 'https://api.prosperworks.com/developer_api/'
 
 
-def connect(email, token, url=_default_url, name='default', cache=None):
+def connect(email, token, url=_default_url, name='default', **options):
     """
     Create a connection to ProsperWorks using credentials `email` and `token`.
 
@@ -26,8 +41,8 @@ def connect(email, token, url=_default_url, name='default', cache=None):
     can provide a different name to maintain multiple connections to
     ProsperWorks.
 
-    By default an in-memory URL cache is used. Argue
-    cache=prospyr.cache.NoOpCache() to disable caching.
+    Further keyword arguments configure caching, HTTP sessions and so on; see
+    Connection.
     """
     if name in _connections:
         existing = _connections[name]
@@ -38,7 +53,7 @@ def connect(email, token, url=_default_url, name='default', cache=None):
 
     validate_url(url)
 
-    conn = Connection(url, email, token, cache=cache, name=name)
+    conn = Connection(url, email, token, name=name, **options)
     _connections[name] = conn
     return conn
 
@@ -97,22 +112,159 @@ def url_join(base, *paths):
 
 
 class Connection(object):
+    """
+    A connection to ProsperWorks. Normally made with connect().
+
+    By default an in-memory URL cache is used. Argue
+    cache=prospyr.cache.NoOpCache() to disable caching. 404 Not Found
+    responses are cached too, but only for `not_found_max_age` seconds.
+
+    Search result pages are not cached by default. Argue e.g.
+    search_cache=prospyr.cache.InMemoryCache() to cache them for
+    `search_max_age` seconds. Writes made through Prospyr invalidate cached
+    pages of the written resource.
+
+    Argue identity_map=True to share one Resource instance per record for the
+    life of the connection. See prospyr.identity for shorter-lived sharing.
+
+    By default one requests.Session is shared by all threads. It keeps up to
+    `pool_maxsize` connections open to ProsperWorks; with `pool_block`,
+    threads wait for a free connection rather than opening extra ones which
+    are discarded after use. Argue session_strategy='thread' to give each
+    thread its own session and pool instead, and keep_alive=False to close
+    connections after each request.
+
+    Requests give up after `connect_timeout` seconds connecting or
+    `read_timeout` seconds waiting for data; argue None for either to wait
+    forever. Request methods also accept a `deadline`, as seconds or a
+    prospyr.deadline.Deadline; timeouts are shortened to end by the deadline,
+    and DeadlineExceeded is raised once it has passed.
+
+    Argue `instruments`, e.g. [prospyr.instrument.LatencyHistogram()], to
+    observe every request. See prospyr.instrument.Instrument.
+
+    Argue n_plus_one='warn' or 'raise' to be told when more than
+    `n_plus_one_threshold` related records are fetched one by one while
+    using search results. See prospyr.nplusone.NPlusOneDetector.
+
+    Requests are sent by `transport`, by default through the session. See
+    prospyr.transport to record requests and replay them offline.
+
+    Request and response bodies are encoded and decoded with `codec`: 'json'
+    (the default), 'orjson', 'ujson' or a codec object. See prospyr.codec.
+    """
+
+    # how long successful GETs are cached for
+    cache_max_age = seconds(minutes=5)
+
+    session_strategies = {'shared', 'thread'}
 
     def __init__(self, url, email, token, name='default', version='v1',
-                 cache=None):
-        self.session = Connection._get_session(email, token)
+                 cache=None, search_cache=None,
+                 search_max_age=seconds(seconds=30),
+                 not_found_max_age=seconds(seconds=30), identity_map=False,
+                 session_strategy='shared', pool_maxsize=10, pool_block=False,
+                 keep_alive=True, connect_timeout=seconds(seconds=10),
+                 read_timeout=seconds(seconds=30), instruments=(),
+                 n_plus_one=None, n_plus_one_threshold=10, transport=None,
+                 codec=None):
+        if session_strategy not in self.session_strategies:
+            raise MisconfiguredError(
+                'session_strategy must be one of %s' %
+                ', '.join(sorted(self.session_strategies))
+            )
+        self.session_strategy = session_strategy
+        self.timeout = (connect_timeout, read_timeout)
+        self._session_options = dict(email=email, token=token,
+                                     pool_maxsize=pool_maxsize,
+                                     pool_block=pool_block,
+                                     keep_alive=keep_alive,
+                                     timeout=self.timeout)
+        self._local = threading.local()
+        self._session = Connection._get_session(**self._session_options)
         self.email = email
         self.base_url = URLObject(url)
         self.api_url = self.base_url.add_path_segment(version)
         self.cache = InMemoryCache() if cache is None else cache
+        self.search_cache = (NoOpCache() if search_cache is None
+                             else search_cache)
+        self.search_max_age = search_max_age
+        self.not_found_max_age = not_found_max_age
+        self.identity_map = IdentityMap() if identity_map else None
+        self.instruments = list(instruments)
+        self.n_plus_one = (NPlusOneDetector(n_plus_one, n_plus_one_threshold)
+                           if n_plus_one else None)
+        self.transport = Transport() if transport is None else transport
+        self.codec = get_codec(codec)
         self.name = name
 
     def http_method(self, method, url, *args, **kwargs):
         """
         Send HTTP request with `method` to `url`.
+
+        If a `deadline` is argued, the request times out by the deadline.
+        """
+        if not self.instruments:
+            return self._send(method, url, *args, **kwargs)
+
+        event = RequestEvent(method, url)
+        self._notify('before_request', event)
+        start = time.time()
+        try:
+            resp = self._send(method, url, *args, **kwargs)
+        except Exception as ex:
+            event.error = ex
+            raise
+        else:
+            event.status = resp.status_code
+            event.request_bytes = _request_bytes(resp)
+            event.response_bytes = _response_bytes(resp)
+        finally:
+            event.latency = time.time() - start
+            self._notify('after_request', event)
+        return resp
+
+    def _send(self, method, url, *args, **kwargs):
+        deadline = Deadline.coerce(kwargs.pop('deadline', None))
+        if kwargs.get('json') is not None:
+            kwargs['data'] = self.codec.dumps(kwargs.pop('json'))
+        send = functools.partial(self.transport.send, self.session, method)
+        if deadline is None:
+            return send(url, *args, **kwargs)
+
+        kwargs['timeout'] = deadline.clamp(kwargs.get('timeout', self.timeout))
+        try:
+            return send(url, *args, **kwargs)
+        except requests.Timeout:
+            if deadline.expired:
+                raise DeadlineExceeded('Deadline of %ss passed requesting %s'
+                                       % (deadline.seconds, url))
+            raise
+
+    def _notify(self, hook, event):
+        for instrument in self.instruments:
+            try:
+                getattr(instrument, hook)(event)
+            except Exception:
+                logger.exception('Instrument %r failed', instrument)
+
+    def _notify_cached(self, method, url, cached, start):
+        """
+        Report a response from cache to instruments.
+        """
+        event = RequestEvent(method, url, from_cache=True)
+        event.status = cached.status_code
+        event.latency = time.time() - start
+        event.request_bytes = event.response_bytes = 0
+        self._notify('after_request', event)
+
+    def decode(self, resp):
+        """
+        Decode the JSON body of `resp`, a response or CachedResponse.
         """
-        method_fn = getattr(self.session, method)
-        return method_fn(url, *args, **kwargs)
+        if isinstance(resp, CachedResponse):
+            return resp.json()
+        return self.codec.loads(resp.content)
 
     def build_absolute_url(self, path):
         """
@@ -120,8 +272,30 @@ class Connection(object):
         """
         return url_join(self.api_url, path)
 
+    @property
+    def session(self):
+        """
+        The requests.Session for the current thread.
+        """
+        if self.session_strategy == 'thread':
+            session = getattr(self._local, 'session', None)
+            if session is None:
+                session = Connection._get_session(**self._session_options)
+                self._local.session = session
+            return session
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        """
+        Use `session` for every thread.
+        """
+        self.session_strategy = 'shared'
+        self._session = session
+
     @staticmethod
-    def _get_session(email, token):
+    def _get_session(email, token, pool_maxsize=10, pool_block=False,
+                     keep_alive=True, timeout=None):
         session = requests.Session()
         defaults = {
             'X-PW-Application': 'developer_api',
@@ -130,14 +304,24 @@ class Connection(object):
             'Accept': 'application/json',
             'Content-Type': 'application/json',
         }
+        if not keep_alive:
+            defaults['Connection'] = 'close'
         session.headers.update(defaults)
+
+        # ProsperWorks is a single host, so one pool per scheme suffices.
+        for scheme in ('https://', 'http://'):
+            adapter = TimeoutHTTPAdapter(timeout=timeout, pool_connections=1,
+                                         pool_maxsize=pool_maxsize,
+                                         pool_block=pool_block)
+            session.mount(scheme, adapter)
         return session
 
     def __getattr__(self, name):
         """
         Turn HTTP verbs into http_method calls so e.g. conn.get(...) works.
 
-        Note that 'get' and 'delete' are special-cased to handle caching
+        Note that 'get', 'get_many' and 'delete' are special-cased to handle
+        caching
         """
         methods = 'post', 'put', 'patch', 'options'
         if name in methods:
@@ -145,14 +329,172 @@ class Connection(object):
         return super(Connection, self).__getattr__(name)
 
     def get(self, url, *args, **kwargs):
+        """
+        GET `url`, consulting the cache. A CachedResponse is returned.
+        """
+        start = time.time()
         cached = self.cache.get(url)
         if cached is None:
-            cached = self.http_method('get', url, *args, **kwargs)
-            self.cache.set(url, cached, max_age=seconds(minutes=5))
+            resp = self.http_method('get', url, *args, **kwargs)
+            cached = CachedResponse.from_response(resp, self.codec.loads)
+            max_age = self._max_age(cached)
+            if max_age is not None:
+                self.cache.set(url, cached, max_age=max_age)
+        elif self.instruments:
+            self._notify_cached('get', url, cached, start)
         return cached
 
+    def get_many(self, urls, *args, **kwargs):
+        """
+        GET each of `urls`. Responses are returned in the order of `urls`.
+
+        The cache is consulted for all of `urls` at once, which saves round
+        trips with networked caches.
+
+        If a `deadline` is argued and passes, the remaining URLs are not
+        requested and None takes the place of their responses.
+        """
+        urls = list(urls)
+        if 'deadline' in kwargs:
+            kwargs['deadline'] = Deadline.coerce(kwargs['deadline'])
+        start = time.time()
+        found = self.cache.get_many(urls)
+        if self.instruments:
+            for url, cached in found.items():
+                self._notify_cached('get', url, cached, start)
+        fresh = {}
+        for url in urls:
+            if url not in found and url not in fresh:
+                try:
+                    resp = self.http_method('get', url, *args, **kwargs)
+                except DeadlineExceeded:
+                    logger.debug('Deadline passed with %s of %s URLs fetched',
+                                 len(found) + len(fresh), len(set(urls)))
+                    break
+                fresh[url] = CachedResponse.from_response(resp,
+                                                          self.codec.loads)
+        by_max_age = {}
+        for url, cached in fresh.items():
+            max_age = self._max_age(cached)
+            if max_age is not None:
+                by_max_age.setdefault(max_age, {})[url] = cached
+        for max_age, mapping in by_max_age.items():
+            self.cache.set_many(mapping, max_age=max_age)
+        found.update(fresh)
+        return [found.get(url) for url in urls]
+
+    def _max_age(self, resp):
+        """
+        How long to cache GET response `resp`, or None to not cache it.
+        """
+        if resp.status_code == codes.ok:
+            return self.cache_max_age
+        elif resp.status_code == codes.not_found:
+            return self.not_found_max_age
+        return None
+
+    def invalidate(self, url):
+        """
+        Forget any cached response for GET `url`, including a 404.
+        """
+        self.cache.clear(url)
+
     def delete(self, url, *args, **kwargs):
         resp = self.http_method('delete', url, *args, **kwargs)
         if resp.ok:
-            self.cache.clear(url)
+            self.invalidate(url)
         return resp
+
+    def search(self, url, query, deadline=None):
+        """
+        POST `query` to search `url`, consulting the search cache.
+
+        Only successful responses are cached. Cached pages are returned as
+        CachedResponse records.
+        """
+        start = time.time()
+        key = self._search_key(url, query)
+        cached = self.search_cache.get(key)
+        if cached is None:
+            resp = self.post(url, json=query, deadline=deadline)
+            if resp.status_code != codes.ok:
+                return resp
+            cached = CachedResponse.from_response(resp, self.codec.loads)
+            self.search_cache.set(key, cached, max_age=self.search_max_age)
+        elif self.instruments:
+            self._notify_cached('post', url, cached, start)
+        return cached
+
+    def search_stream(self, url, query, deadline=None):
+        """
+        POST `query` to search `url`, returning the response before its body
+        is read, to be streamed. The search cache is not consulted.
+        """
+        return self.post(url, json=query, deadline=deadline, stream=True)
+
+    def invalidate_search(self, url):
+        """
+        Forget every cached search page of `url`.
+        """
+        self.search_cache.set(self._generation_key(url), uuid4().hex)
+
+    def _search_key(self, url, query):
+        # pages of one search URL share a generation token; replacing the
+        # token orphans those pages without knowing their keys.
+        generation_key = self._generation_key(url)
+        try:
+            # meta() rather than get(), so cache stats count only pages
+            entry = self.search_cache.meta(generation_key)
+        except KeyError:
+            entry = None
+        generation = getattr(entry, 'value', None)
+        if generation is None:
+            generation = uuid4().hex
+            self.search_cache.set(generation_key, generation)
+        else:
+            # the token is used as often as every page of this URL together;
+            # were it evicted, every one of those pages would be orphaned.
+            self.search_cache.touch(generation_key)
+        canonical = json.dumps(query, sort_keys=True, separators=(',', ':'))
+        return '{url}#{generation}#{query}'.format(
+            url=url, generation=generation, query=canonical)
+
+    @staticmethod
+    def _generation_key(url):
+        return '{url}#generation'.format(url=url)
+
+
+def _request_bytes(resp):
+    body = getattr(getattr(resp, 'request', None), 'body', None)
+    if body is None:
+        return 0
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    return len(body)
+
+
+def _response_bytes(resp):
+    length = resp.headers.get('Content-Length')
+    if length is not None:
+        return int(length)
+    if getattr(resp, '_content', None) is False:
+        # an unread stream; reading it here would defeat streaming
+        return None
+    return len(resp.content or b'')
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter which applies `timeout` to requests which argue none.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['timeout']
+
+    def __init__(self, timeout=None, *args, **kwargs):
+        self.timeout = timeout
+        super(TimeoutHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super(TimeoutHTTPAdapter, self).send(request, **kwargs)
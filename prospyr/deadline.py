@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import time
+
+from prospyr.exceptions import DeadlineExceeded
+
+
+class Deadline(object):
+    """
+    A time by which an operation spanning several requests should finish.
+
+    Operations which accept a deadline accept a number of seconds too; the
+    clock then starts when the operation does. Share one Deadline between
+    operations to bound them all together.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.time() + seconds
+
+    @classmethod
+    def coerce(cls, deadline):
+        """
+        A Deadline from `deadline`, which may be seconds, a Deadline or None.
+        """
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self):
+        """
+        Seconds until the deadline, or 0 once it has passed.
+        """
+        return max(0, self.expires - time.time())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def clamp(self, timeout):
+        """
+        Shorten requests `timeout` so that it ends by the deadline.
+
+        `timeout` may be None, seconds, or a (connect, read) tuple.
+        DeadlineExceeded is raised if the deadline has passed.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('Deadline of %ss has passed' % self.seconds)
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining)
+                         for t in timeout)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def __repr__(self):
+        return '<Deadline: %.3fs remaining>' % self.remaining()
@@ -25,3 +25,19 @@ class ValidationError(ProspyrException):
         self.errors = errors
         self.raw_data = raw_data
         self.resource_cls = resource_cls
+
+
+class DeadlineExceeded(ProspyrException):
+    pass
+
+
+class NPlusOneError(ProspyrException):
+    pass
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class UnrecordedRequest(ProspyrException):
+    pass
@@ -10,7 +10,8 @@ from marshmallow import ValidationError, fields
 from marshmallow.utils import missing as missing_
 from requests import codes
 
-from prospyr import exceptions
+from prospyr import exceptions, nplusone
+from prospyr.tracing import get_tracer
 from prospyr.util import encode_typename, import_dotted_path
 from prospyr.validate import WhitespaceEmail
 
@@ -74,6 +75,17 @@ def normalise_many(fn, default=False):
     return wrapper
 
 
+def _fetch_nested(resource_cls, id, attr):
+    nplusone.nested_fetched(attr, resource_cls)
+    attributes = {
+        'prospyr.resource': resource_cls.__name__,
+        'prospyr.id': id,
+    }
+    with get_tracer().start_as_current_span('prospyr.nested_fetch',
+                                            attributes=attributes):
+        return resource_cls.objects.get(id=id)
+
+
 class NestedResource(fields.Field):
     """
     Represent a nested data structure as a Resource instance.
@@ -97,7 +109,8 @@ class NestedResource(fields.Field):
         resources = []
         for value in values:
             if self.id_only:
-                resources.append(self.resource_cls.objects.get(id=value['id']))
+                resource = _fetch_nested(self.resource_cls, value['id'], attr)
+                resources.append(resource)
             else:
                 resources.append(self.resource_cls.from_api_data(value))
         return resources
@@ -156,7 +169,7 @@ class NestedIdentifiedResource(fields.Field):
                     raise ValueError('Unknown identifier type %s' % idtype)
                 resource_cls = import_dotted_path(resource_path)
                 try:
-                    resource = resource_cls.objects.get(id=value['id'])
+                    resource = _fetch_nested(resource_cls, value['id'], attr)
                 except exceptions.ApiError as ex:
                     status_code, msg = ex.args
                     if status_code == codes.not_found:
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+from contextlib import contextmanager
+from weakref import WeakValueDictionary
+
+_local = threading.local()
+
+
+class IdentityMap(object):
+    """
+    Hold a single instance per resource class and id.
+
+    Rather than building a fresh instance each time a record is seen, the
+    instance seen first is returned. It is refreshed in place only when data
+    with a later `date_modified` arrives, so unchanged records are not
+    deserialised again.
+
+    Instances are held weakly: once nothing else refers to one, it is
+    forgotten.
+    """
+
+    def __init__(self):
+        self._instances = WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._instances)
+
+    def get(self, resource_cls, id):
+        """
+        The instance of `resource_cls` with `id`, or None.
+        """
+        return self._instances.get((resource_cls, id))
+
+    def load(self, resource_cls, orig_data):
+        """
+        The instance of `resource_cls` represented by API data `orig_data`.
+        """
+        id = orig_data.get('id')
+        existing = self._instances.get((resource_cls, id))
+        if existing is None:
+            instance = resource_cls()
+            instance._refresh(orig_data)
+            return self.add(instance)
+        if self._is_newer(orig_data, existing):
+            existing._refresh(orig_data)
+        return existing
+
+    def add(self, instance):
+        """
+        Remember `instance`, returning the instance to use in its place.
+
+        If an instance with the same class and id is already held, it is
+        returned instead, after being refreshed from `instance` if that is
+        newer.
+        """
+        id = getattr(instance, 'id', None)
+        if id is None:
+            return instance
+        key = (type(instance), id)
+        existing = self._instances.setdefault(key, instance)
+        if existing is not instance:
+            orig_data = getattr(instance, '_orig_data', None)
+            if orig_data is not None and self._is_newer(orig_data, existing):
+                existing._refresh(orig_data)
+        return existing
+
+    def clear(self):
+        self._instances.clear()
+
+    @staticmethod
+    def _is_newer(orig_data, instance):
+        modified = orig_data.get('date_modified')
+        existing_data = getattr(instance, '_orig_data', None) or {}
+        existing_modified = existing_data.get('date_modified')
+        if modified is None:
+            return False
+        return existing_modified is None or modified > existing_modified
+
+
+def active(using='default'):
+    """
+    The identity map in use for the connection named `using`, or None.
+
+    This is the map of the innermost unit_of_work() block for `using` in the
+    current thread, if any, and otherwise the connection's own identity map.
+    """
+    from prospyr import connection  # avoid circular import
+
+    stack = _stacks().get(using)
+    if stack:
+        return stack[-1]
+    return connection.get(using).identity_map
+
+
+@contextmanager
+def unit_of_work(using='default'):
+    """
+    Share one instance per record within the block.
+
+    A fresh IdentityMap is yielded and used, in place of any identity map the
+    connection named `using` has, by queries made in the block. Only the
+    current thread is affected, so the connection can still be shared.
+    """
+    identity_map = IdentityMap()
+    stack = _stacks().setdefault(using, [])
+    stack.append(identity_map)
+    try:
+        yield identity_map
+    finally:
+        stack.pop()
+
+
+def _stacks():
+    try:
+        return _local.stacks
+    except AttributeError:
+        _local.stacks = {}
+        return _local.stacks
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import bisect
+import threading
+
+from prospyr.util import url_template
+
+
+class RequestEvent(object):
+    """
+    A request made, or answered from cache, by a Connection.
+
+    Instruments see the same event before and after a request. Status,
+    latency (in seconds), the bytes of the bodies sent and received, and any
+    error raised are filled in afterwards. Prospyr does not retry requests, so
+    retries is always 0 for now.
+    """
+
+    def __init__(self, method, url, from_cache=False):
+        self.method = method
+        self.url = url
+        self.template = url_template(url)
+        self.from_cache = from_cache
+        self.retries = 0
+        self.status = None
+        self.latency = None
+        self.request_bytes = None
+        self.response_bytes = None
+        self.error = None
+
+    @property
+    def endpoint(self):
+        """
+        The method and URL template, e.g. "GET people/{id}/".
+        """
+        return '{method} {template}'.format(method=self.method.upper(),
+                                            template=self.template)
+
+    def __repr__(self):
+        return '<RequestEvent: {endpoint} {status}>'.format(
+            endpoint=self.endpoint, status=self.status)
+
+
+class Instrument(object):
+    """
+    Receives a RequestEvent before and after each request of a Connection.
+
+    Add instruments with connect(..., instruments=[...]) or by appending to
+    Connection.instruments. Responses from cache are reported to
+    after_request() only. Exceptions raised by instruments are logged and
+    otherwise ignored.
+    """
+
+    def before_request(self, event):
+        pass
+
+    def after_request(self, event):
+        pass
+
+
+class _EndpointLatency(object):
+
+    def __init__(self, nbuckets):
+        self.counts = [0] * nbuckets
+        self.total = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class LatencyHistogram(Instrument):
+    """
+    Latency histograms per endpoint, i.e. per method and URL template.
+
+    `buckets` are the upper bounds, in seconds, of all but the last bucket.
+    Responses from cache are counted but kept out of the histograms. Safe to
+    share between threads and connections.
+    """
+
+    default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                       10)
+
+    def __init__(self, buckets=default_buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def after_request(self, event):
+        with self._lock:
+            latency = self._endpoints.get(event.endpoint)
+            if latency is None:
+                latency = _EndpointLatency(len(self.buckets) + 1)
+                self._endpoints[event.endpoint] = latency
+
+            if event.from_cache:
+                latency.cache_hits += 1
+                return
+            latency.counts[bisect.bisect_left(self.buckets,
+                                              event.latency)] += 1
+            latency.total += event.latency
+            latency.errors += event.error is not None
+            latency.bytes_sent += event.request_bytes or 0
+            latency.bytes_received += event.response_bytes or 0
+
+    def quantile(self, endpoint, q):
+        """
+        Estimate the `q` quantile of latency of `endpoint`, e.g. 0.95.
+
+        The upper bound of the bucket holding the quantile is returned, or
+        None if it falls in the last, unbounded bucket or nothing was timed.
+        """
+        with self._lock:
+            latency = self._endpoints.get(endpoint)
+            counts = list(latency.counts) if latency else []
+        return self._quantile(counts, q)
+
+    def _quantile(self, counts, q):
+        rank = q * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        """
+        A dict of endpoint to counters, suitable for exporting as metrics.
+
+        Buckets are listed as [upper bound, count] pairs, with None as the
+        bound of the last bucket.
+        """
+        bounds = list(self.buckets) + [None]
+        with self._lock:
+            return {
+                endpoint: {
+                    'count': latency.count,
+                    'sum': latency.total,
+                    'mean': (latency.total / latency.count
+                             if latency.count else None),
+                    'p50': self._quantile(latency.counts, 0.5),
+                    'p95': self._quantile(latency.counts, 0.95),
+                    'p99': self._quantile(latency.counts, 0.99),
+                    'errors': latency.errors,
+                    'cache_hits': latency.cache_hits,
+                    'bytes_sent': latency.bytes_sent,
+                    'bytes_received': latency.bytes_received,
+                    'buckets': [[bound, count] for bound, count
+                                in zip(bounds, latency.counts)],
+                }
+                for endpoint, latency in self._endpoints.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
@@ -32,11 +32,12 @@ class Creatable(object):
         resp = conn.post(conn.build_absolute_url(path), json=self._raw_data)
 
         if resp.status_code in self._create_success_codes:
-            data = self._load_raw(resp.json())
+            data = self._load_raw(conn.decode(resp))
             self._set_fields(data)
+            self._invalidate_search(conn)
             return True
         elif resp.status_code == codes.unprocessable_entity:
-            error = resp.json()
+            error = conn.decode(resp)
             raise ValueError(error['message'])
         else:
             raise ApiError(resp.status_code, resp.text)
@@ -60,8 +61,7 @@ class Readable(object):
         if resp.status_code not in self._read_success_codes:
             raise ApiError(resp.status_code, resp.text)
 
-        data = self._load_raw(resp.json())
-        self._set_fields(data)
+        self._refresh(conn.decode(resp))
         return True
 
     def _get_path(self):
@@ -99,12 +99,14 @@ class Updateable(object):
         data.pop('id')
 
         conn = self._get_conn(using)
-        path = self.Meta.detail_path.format(id=self.id)
-        resp = conn.put(conn.build_absolute_url(path), json=data)
+        url = conn.build_absolute_url(self.Meta.detail_path.format(id=self.id))
+        resp = conn.put(url, json=data)
         if resp.status_code in self._update_success_codes:
+            conn.invalidate(url)
+            self._invalidate_search(conn)
             return True
         elif resp.status_code == codes.unprocessable_entity:
-            error = resp.json()
+            error = conn.decode(resp)
             raise ValueError(error['message'])
         else:
             raise ApiError(resp.status_code, resp.text)
@@ -127,6 +129,7 @@ class Deletable(object):
         path = self.Meta.detail_path.format(id=self.id)
         resp = conn.delete(conn.build_absolute_url(path))
         if resp.status_code in self._delete_success_codes:
+            self._invalidate_search(conn)
             return True
         else:
             raise ApiError(resp.status_code, resp.text)
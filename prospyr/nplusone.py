@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+import warnings
+from contextlib import contextmanager
+from weakref import WeakKeyDictionary
+
+from prospyr.exceptions import NPlusOneError, NPlusOneWarning
+
+_local = threading.local()
+
+
+class NPlusOneDetector(object):
+    """
+    Spot a detail fetch repeated for each result of a ResultSet.
+
+    Fetches of related records, through Related attributes or nested
+    identifier fields, are counted per result set, resource and attribute.
+    Once a count passes `threshold`, a NPlusOneWarning is issued or, with
+    mode='raise', NPlusOneError is raised.
+    """
+
+    modes = {'warn', 'raise'}
+
+    def __init__(self, mode='warn', threshold=10):
+        if mode not in self.modes:
+            raise ValueError('mode must be one of %s' %
+                             ', '.join(sorted(self.modes)))
+        self.mode = mode
+        self.threshold = threshold
+        self._counts = WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def fetched(self, result_set, attr, related_cls):
+        """
+        Count a fetch of `related_cls` for `attr` of a `result_set` result.
+        """
+        from prospyr.resources import ListOnlyManager  # avoid circular import
+        if isinstance(related_cls.objects, ListOnlyManager):
+            # every record is fetched by one list request, and then kept
+            return
+
+        resource_cls = result_set._resource_cls
+        key = (resource_cls, attr, related_cls)
+        with self._lock:
+            counts = self._counts.setdefault(result_set, {})
+            count = counts[key] = counts.get(key, 0) + 1
+        if count <= self.threshold:
+            return
+
+        msg = (
+            '{count} {related} records were fetched one by one for '
+            '{resource}.{attr} while using the results of one query. Load '
+            'them in a batch instead, e.g. with '
+            '{related}.objects.get_many(ids).'
+        ).format(count=count, related=related_cls.__name__,
+                 resource=resource_cls.__name__, attr=attr)
+        if self.mode == 'raise':
+            raise NPlusOneError(msg)
+        elif count == self.threshold + 1:
+            warnings.warn(msg, NPlusOneWarning, stacklevel=4)
+
+
+def _detector(result_set):
+    if result_set is None:
+        return None
+    return result_set._conn.n_plus_one
+
+
+@contextmanager
+def building(result_set):
+    """
+    Attribute nested fetches made in this block to `result_set`.
+    """
+    previous = getattr(_local, 'result_set', None)
+    _local.result_set = result_set
+    try:
+        yield
+    finally:
+        _local.result_set = previous
+
+
+def nested_fetched(attr, related_cls):
+    """
+    Count a nested fetch, if made while building a result set's results.
+    """
+    result_set = getattr(_local, 'result_set', None)
+    detector = _detector(result_set)
+    if detector is not None:
+        detector.fetched(result_set, attr, related_cls)
+
+
+def related_fetched(instance, attr, related_cls):
+    """
+    Count a fetch through Related attribute `attr` of `instance`.
+    """
+    result_set = getattr(instance, '_result_set', None)
+    detector = _detector(result_set)
+    if detector is not None:
+        detector.fetched(result_set, attr, related_cls)
@@ -2,31 +2,77 @@
 
 from __future__ import absolute_import, print_function, unicode_literals
 
+import copy
+import threading
+import time
 from logging import getLogger
+from weakref import WeakKeyDictionary
 
 from marshmallow import fields
 from marshmallow.validate import OneOf
 from requests import codes
 from six import string_types, with_metaclass
 
-from prospyr import connection, exceptions, mixins, schema
+from prospyr import connection, exceptions, identity, mixins, nplusone, schema
 from prospyr.exceptions import ApiError, ProspyrException
 from prospyr.fields import NestedIdentifiedResource, NestedResource, Unix
 from prospyr.search import ActivityTypeListSet, ListSet, ResultSet
-from prospyr.util import encode_typename, import_dotted_path, to_snake
+from prospyr.util import encode_typename, import_dotted_path, seconds, to_snake
 
 logger = getLogger(__name__)
 
 
 class Manager(object):
+    """
+    Query and fetch instances of a Resource.
+
+    Managers are descriptors. Accessing one through a Resource class returns
+    a manager bound to that class and the default connection, and use()
+    returns another bound to a different connection. Bound managers are never
+    modified, so they are safe to share between threads.
+    """
 
     _search_cls = ResultSet
 
+    def __init__(self):
+        self._bound_managers = {}
+
     def get(self, id):
         instance = self.resource_cls()
         instance.id = id
-        instance.read(using=self.using)
-        return instance
+        identity_map = identity.active(self.using)
+        if identity_map is None:
+            instance.read(using=self.using)
+            return instance
+
+        # load through the identity map, so an unchanged record held there
+        # is returned without being deserialised again
+        conn = connection.get(self.using)
+        resp = conn.get(conn.build_absolute_url(instance._get_path()))
+        if resp.status_code not in instance._read_success_codes:
+            raise ApiError(resp.status_code, resp.text)
+        return identity_map.load(self.resource_cls, conn.decode(resp))
+
+    def get_many(self, ids, deadline=None):
+        """
+        Fetch instances by id, returning a dict of id to instance.
+
+        If `deadline` passes, ids not yet fetched are absent from the result.
+        `deadline` is seconds or a prospyr.deadline.Deadline.
+        """
+        ids = list(ids)
+        conn = connection.get(self.using)
+        found = {}
+        path = self.resource_cls.Meta.detail_path
+        urls = [conn.build_absolute_url(path.format(id=id)) for id in ids]
+        for id, resp in zip(ids, conn.get_many(urls, deadline=deadline)):
+            if resp is None:
+                continue
+            if resp.status_code != codes.ok:
+                raise ApiError(resp.status_code, resp.text)
+            found[id] = self.resource_cls.from_api_data(resp.json(),
+                                                        using=self.using)
+        return found
 
     def __get__(self, instance, cls):
         if instance:
@@ -37,13 +83,22 @@ class Manager(object):
                     manager_cls=type(self).__name__
                 )
             )
-        self.resource_cls = cls
-        self.using = 'default'
-        return self
+        return self._bind(resource_cls=cls, using='default')
 
     def use(self, name):
-        self.using = name
-        return self
+        return self._bind(resource_cls=self.resource_cls, using=name)
+
+    def _bind(self, resource_cls, using):
+        # bound managers are shallow copies; they share _bound_managers, so
+        # each class and connection pair is bound just once.
+        key = (resource_cls, using)
+        bound = self._bound_managers.get(key)
+        if bound is None:
+            bound = copy.copy(self)
+            bound.resource_cls = resource_cls
+            bound.using = using
+            bound = self._bound_managers.setdefault(key, bound)
+        return bound
 
     def all(self):
         return self.filter()
@@ -64,32 +119,109 @@ class Manager(object):
         return fresh.store_invalid(dest)
 
 
+class _ListResults(object):
+    """
+    The results of a list-only resource, as fetched by one connection.
+    """
+
+    def __init__(self):
+        self.by_id = None
+        self.fetched = None
+        self.generation = 0
+        self.unknown_id_refreshed = None
+        self.lock = threading.Lock()
+
+
 class ListOnlyManager(Manager):
     """
     Manage a resource which has only a list URL.
 
     Some ProsperWorks resources are list-only; they have no search or detail
     URLs. The get() method is simulated. filtering and ordering is disabled.
+
+    Results are kept per connection and resource for `results_max_age`
+    seconds. An unknown id triggers a refresh at most once per
+    `unknown_id_interval` seconds.
     """
 
-    _results_by_id = None
     _search_cls = ListSet
+    results_max_age = seconds(minutes=5)
+    unknown_id_interval = seconds(seconds=30)
+
+    def __init__(self):
+        super(ListOnlyManager, self).__init__()
+        self._results = WeakKeyDictionary()
+        self._results_lock = threading.Lock()
+
+    def _list_results(self):
+        conn = connection.get(self.using)
+        with self._results_lock:
+            by_cls = self._results.setdefault(conn, {})
+            return by_cls.setdefault(self.resource_cls, _ListResults())
 
     def results_by_id(self, force_refresh=False):
-        if self._results_by_id is None or force_refresh is True:
-            rs = self.all()
-            self._results_by_id = {r.id: r for r in rs}
-        return self._results_by_id
+        results = self._list_results()
+        stale = (
+            results.fetched is None or
+            results.fetched + self.results_max_age <= time.time()
+        )
+        if stale or force_refresh is True:
+            self._refresh(results)
+        return results.by_id
+
+    def load_results(self, body):
+        """
+        Keep the results in `body`, a list response already fetched and
+        decoded, as if they had just been fetched. Returns results_by_id().
+        """
+        results = self._list_results()
+        with results.lock:
+            self._keep(results, self.all().from_body(body))
+        return results.by_id
+
+    def _refresh(self, results):
+        generation = results.generation
+        with results.lock:
+            # another thread may have refreshed while we waited
+            if results.generation != generation:
+                return
+            self._keep(results, self.all())
+
+    @staticmethod
+    def _keep(results, resources):
+        results.by_id = {r.id: r for r in resources}
+        results.fetched = time.time()
+        results.generation += 1
 
     def get(self, id):
         result = self.results_by_id().get(id)
         if result is None:
-            # perhaps our cache is stale?
-            result = self.results_by_id(force_refresh=True).get(id)
+            # perhaps our cache is stale? refresh, though not too often.
+            results = self._list_results()
+            now = time.time()
+            may_refresh = (
+                results.unknown_id_refreshed is None or
+                results.unknown_id_refreshed + self.unknown_id_interval <= now
+            )
+            if may_refresh:
+                results.unknown_id_refreshed = now
+                conn = connection.get(self.using)
+                path = self.resource_cls.Meta.list_path
+                conn.invalidate(conn.build_absolute_url(path))
+                result = self.results_by_id(force_refresh=True).get(id)
+            else:
+                # a refresh may be underway
+                with results.lock:
+                    result = results.by_id.get(id)
             if result is None:
                 raise KeyError('Record with id `%s` does not exist' % id)
         return result
 
+    def get_many(self, ids, deadline=None):
+        # one list request fetches everything, so there is nothing to cut
+        # short.
+        return {id: self.get(id) for id in ids}
+
     def all(self):
         return self._search_cls(resource_cls=self.resource_cls,
                                 using=self.using)
@@ -124,6 +256,10 @@ class SingletonManager(NoCollectionManager):
         instance.read(using=self.using)
         return instance
 
+    def get_many(self, ids, deadline=None):
+        raise NotImplementedError('%s has a single instance.' %
+                                  self.resource_cls.__name__)
+
 
 class ActivityTypeManager(ListOnlyManager):
     """
@@ -145,7 +281,8 @@ class PersonManager(Manager):
             )
             if resp.status_code not in {codes.ok}:
                 raise ApiError(resp.status_code, resp.text)
-            return self.resource_cls.from_api_data(resp.json())
+            return self.resource_cls.from_api_data(conn.decode(resp),
+                                                   using=self.using)
         raise ProspyrException("id or email is required when getting a Person")
 
 
@@ -217,16 +354,29 @@ class Resource(with_metaclass(ResourceMeta)):
             )
 
     @classmethod
-    def from_api_data(cls, orig_data):
+    def from_api_data(cls, orig_data, using=None):
         """
         Alternate constructor. Build instance from ProsperWorks API data.
+
+        If the connection named `using` has an identity map, an instance
+        already held there may be returned instead.
         """
-        data = cls._load_raw(orig_data)
+        if using is not None:
+            identity_map = identity.active(using)
+            if identity_map is not None:
+                return identity_map.load(cls, orig_data)
         instance = cls()
-        instance._set_fields(data)
-        instance._orig_data = orig_data
+        instance._refresh(orig_data)
         return instance
 
+    def _refresh(self, orig_data):
+        """
+        Overwrite the fields of this instance with ProsperWorks API data.
+        """
+        data = self._load_raw(orig_data)
+        self._set_fields(data)
+        self._orig_data = orig_data
+
     @classmethod
     def _load_raw(cls, raw_data):
         """
@@ -259,6 +409,14 @@ class Resource(with_metaclass(ResourceMeta)):
     def _get_conn(self, using):
         return connection.get(using)
 
+    def _invalidate_search(self, conn):
+        """
+        Forget cached search pages which may include this Resource.
+        """
+        path = getattr(self.Meta, 'search_path', None)
+        if path is not None:
+            conn.invalidate_search(conn.build_absolute_url(path))
+
     def _set_fields(self, data):
         """
         Without validating, write `data` onto the fields of this Resource.
@@ -313,6 +471,7 @@ class Related(object):
         id = getattr(instance, '%s_id' % attr)
         if id is None:
             return None
+        nplusone.related_fetched(instance, attr, self.related_cls)
         return self.related_cls.objects.get(id=id)
 
     def __set__(self, instance, value):
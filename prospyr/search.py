@@ -6,7 +6,10 @@ from logging import getLogger
 
 from requests import codes
 
-from prospyr import connection, exceptions
+from prospyr import connection, exceptions, nplusone, stream
+from prospyr.columns import ColumnBuilder, to_dataframe
+from prospyr.deadline import Deadline
+from prospyr.tracing import get_tracer
 
 logger = getLogger(__name__)
 
@@ -91,24 +94,40 @@ class LazyCacheList(object):
         ValidationErrors are raised or stored, if store_invalid() has been
         called.
         """
+        detector = self._conn.n_plus_one
         for row in rows:
             try:
-                yield self._resource_cls.from_api_data(row)
+                if detector is None:
+                    resource = self._resource_cls.from_api_data(
+                        row, using=self._using)
+                else:
+                    with nplusone.building(self):
+                        resource = self._resource_cls.from_api_data(
+                            row, using=self._using)
+                    resource._result_set = self
             except exceptions.ValidationError as ex:
                 if self._invalid_dest is not None:
                     self._invalid_dest.append(ex)
                 else:
                     raise
+            else:
+                yield resource
 
 
 class ResultSet(LazyCacheList):
     """
     Immutable, lazy search results.
+
+    With a deadline, iteration stops early rather than request pages after
+    the deadline has passed; `partial` is then True.
+
+    When streamed, each page is parsed as it downloads, and each resource is
+    built as soon as its row has arrived. See prospyr.stream.
     """
 
     def __init__(self, resource_cls, params=None, order_field=None,
                  order_dir='asc', using='default', page_size=100,
-                 invalid_dest=None):
+                 invalid_dest=None, deadline=None, stream=False):
         super(ResultSet, self).__init__(invalid_dest=invalid_dest)
         self._params = params or {}
         self._order_field = order_field
@@ -116,6 +135,9 @@ class ResultSet(LazyCacheList):
         self._resource_cls = resource_cls
         self._using = using
         self._page_size = page_size
+        self._deadline = deadline
+        self._stream = stream
+        self.partial = False
 
     def all(self):
         return self.filter()
@@ -127,7 +149,8 @@ class ResultSet(LazyCacheList):
                          resource_cls=self._resource_cls,
                          order_field=self._order_field,
                          order_dir=self._order_dir, page_size=self._page_size,
-                         invalid_dest=self._invalid_dest)
+                         invalid_dest=self._invalid_dest,
+                         deadline=self._deadline, stream=self._stream)
 
     def order_by(self, field):
         dir = 'asc'
@@ -142,7 +165,54 @@ class ResultSet(LazyCacheList):
         return ResultSet(params=self._params, using=self._using,
                          resource_cls=self._resource_cls, order_dir=dir,
                          order_field=field, page_size=self._page_size,
-                         invalid_dest=self._invalid_dest)
+                         invalid_dest=self._invalid_dest,
+                         deadline=self._deadline, stream=self._stream)
+
+    def deadline(self, deadline):
+        """
+        Stop fetching results once `deadline` passes.
+
+        `deadline` is seconds from the first request, or a
+        prospyr.deadline.Deadline.
+        """
+        return ResultSet(params=self._params, using=self._using,
+                         resource_cls=self._resource_cls,
+                         order_field=self._order_field,
+                         order_dir=self._order_dir, page_size=self._page_size,
+                         invalid_dest=self._invalid_dest, deadline=deadline,
+                         stream=self._stream)
+
+    def stream(self, stream=True):
+        """
+        Parse each page of results as it downloads, rather than once it has
+        arrived in full. Streamed pages bypass the search cache.
+        """
+        return ResultSet(params=self._params, using=self._using,
+                         resource_cls=self._resource_cls,
+                         order_field=self._order_field,
+                         order_dir=self._order_dir, page_size=self._page_size,
+                         invalid_dest=self._invalid_dest,
+                         deadline=self._deadline, stream=stream)
+
+    def to_columns(self, columns=None):
+        """
+        Return the results as an OrderedDict of name to typed column array.
+
+        No resources are built and rows are not validated; each page is
+        converted to arrays as it arrives. Argue `columns` to choose field
+        names, which may include nested fields. Needs NumPy; see
+        prospyr.columns.
+        """
+        builder = ColumnBuilder(self._resource_cls, columns=columns)
+        for rows in self._pages(self._raw_page):
+            builder.add_page(rows)
+        return builder.columns()
+
+    def to_dataframe(self, columns=None):
+        """
+        Return the results as a pandas.DataFrame. See to_columns().
+        """
+        return to_dataframe(self.to_columns(columns=columns))
 
     @property
     def _conn(self):
@@ -168,28 +238,154 @@ class ResultSet(LazyCacheList):
 
         You should not normally need to call this method directly.
         """
+        read_page = self._stream_page if self._stream else self._read_page
+        for resource in self._pages(read_page):
+            yield resource
+
+    def _pages(self, read_page):
+        """
+        Yield what read_page(tracer, root, query, deadline, page) yields for
+        each page of results in turn, until the last.
+        """
         query = self._build_query()
+        deadline = Deadline.coerce(self._deadline)
+
+        # the root span is made current only while a page is fetched and
+        # built, not while results are consumed between yields.
+        tracer = get_tracer()
+        root = tracer.start_span('prospyr.ResultSet', attributes={
+            'prospyr.resource': self._resource_cls.__name__,
+        })
+        rows = 0
+        try:
+            for query['page_number'] in count(1):
+                page = _Page()
+                try:
+                    for result in read_page(tracer, root, query, deadline,
+                                            page):
+                        yield result
+                except exceptions.DeadlineExceeded:
+                    logger.debug('Deadline passed before page %s of %s',
+                                 query['page_number'], self._url)
+                    self.partial = True
+                    break
+                finally:
+                    rows += page.rows
+
+                # detect last page of results. an empty page (200 OK, not
+                # 404) means there were no more results.
+                if page.rows < self._page_size:
+                    break
+        finally:
+            root.set_attribute('prospyr.rows', rows)
+            root.set_attribute('prospyr.pages', query['page_number'])
+            root.end()
+
+    def _raw_page(self, tracer, root, query, deadline, page):
+        """
+        Yield the rows of page query['page_number'] as a list, unless empty.
+        """
+        with tracer.use_span(root):
+            page_data = self._fetch_page(tracer, query, deadline)
+        page.rows = len(page_data)
+        if page_data:
+            yield page_data
 
-        for query['page_number'] in count(1):
-            resp = self._conn.post(self._url, json=query)
+    def _read_page(self, tracer, root, query, deadline, page):
+        """
+        Yield the resources of page query['page_number'], building each only
+        as it is consumed.
+
+        The page's resources are built in one span, made current only while
+        a resource is built.
+        """
+        with tracer.use_span(root):
+            page_data = self._fetch_page(tracer, query, deadline)
+            page.rows = len(page_data)
+            if not page_data:
+                return
+            span = tracer.start_span('prospyr.build_resources', attributes={
+                'prospyr.page_number': query['page_number'],
+                'prospyr.rows': page.rows,
+            })
+        try:
+            resources = self._build_resources(page_data)
+            while True:
+                with tracer.use_span(span):
+                    resource = next(resources, None)
+                if resource is None:
+                    break
+                yield resource
+        finally:
+            span.end()
+
+    def _stream_page(self, tracer, root, query, deadline, page):
+        """
+        Yield the resources of page query['page_number'] as its rows arrive.
+
+        The page span is made current only while rows are parsed and built.
+        """
+        with tracer.use_span(root):
+            span = tracer.start_span('prospyr.search_page', attributes={
+                'prospyr.page_number': query['page_number'],
+            })
+            try:
+                resp = self._conn.search_stream(self._url, query,
+                                                deadline=deadline)
+            except Exception:
+                span.end()
+                raise
+        try:
+            if resp.status_code != codes.ok:
+                raise exceptions.ApiError(resp.status_code, resp.text)
+            rows = _count_rows(stream.iter_items(stream.iter_chunks(resp)),
+                               page)
+            resources = self._build_resources(rows)
+            while True:
+                with tracer.use_span(span):
+                    resource = next(resources, None)
+                if resource is None:
+                    break
+                yield resource
+            logger.debug('%s results streamed on page %s of %s',
+                         page.rows, query['page_number'], self._url)
+        finally:
+            span.set_attribute('prospyr.rows', page.rows)
+            span.end()
+            if resp.raw is not None:  # canned responses have no connection
+                resp.close()
+
+    def _fetch_page(self, tracer, query, deadline):
+        """
+        Return the rows of page query['page_number'].
+        """
+        attributes = {'prospyr.page_number': query['page_number']}
+        with tracer.start_as_current_span('prospyr.search_page',
+                                          attributes=attributes) as span:
+            resp = self._conn.search(self._url, query, deadline=deadline)
             if resp.status_code != codes.ok:
                 raise exceptions.ApiError(resp.status_code, resp.text)
-
-            # no (more) results
             page_data = resp.json()
-            logger.debug('%s results on page %s of %s',
-                         len(page_data), query['page_number'], self._url)
+            span.set_attribute('prospyr.rows', len(page_data))
 
-            # 200 OK (not 404) and empty results if no more results
-            if not page_data:
-                break
+        logger.debug('%s results on page %s of %s',
+                     len(page_data), query['page_number'], self._url)
+        return page_data
 
-            for resource in self._build_resources(page_data):
-                yield resource
 
-            # detect last page of results
-            if len(page_data) < self._page_size:
-                break
+class _Page(object):
+    """
+    How many rows a page of search results held.
+    """
+
+    def __init__(self):
+        self.rows = 0
+
+
+def _count_rows(rows, page):
+    for row in rows:
+        page.rows += 1
+        yield row
 
 
 class ListSet(LazyCacheList):
@@ -211,9 +407,18 @@ class ListSet(LazyCacheList):
         if resp.status_code != codes.ok:
             raise exceptions.ApiError(resp.status_code, resp.text)
 
-        for resource in self._build_resources(resp.json()):
+        for resource in self.from_body(resp.json()):
             yield resource
 
+    def from_body(self, body):
+        """
+        Yield resources built from `body`, the decoded list response.
+        """
+        return self._build_resources(self._rows(body))
+
+    def _rows(self, body):
+        return body
+
     def all(self):
         return self
 
@@ -238,16 +443,5 @@ class ActivityTypeListSet(ListSet):
         parent = super(ActivityTypeListSet, self)
         parent.__init__(resource_cls=resource_cls, using=using)
 
-    def _results_generator(self):
-        path = self._resource_cls.Meta.list_path
-        url = self._conn.build_absolute_url(path)
-        resp = self._conn.get(url)
-
-        if resp.status_code != codes.ok:
-            raise exceptions.ApiError(resp.status_code, resp.text)
-
-        raw_data = resp.json()
-        rows = raw_data['user'] + raw_data['system']  # combine the two lists.
-
-        for resource in self._build_resources(rows):
-            yield resource
+    def _rows(self, body):
+        return body['user'] + body['system']  # combine the two lists.
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental parsing of JSON arrays, such as search result pages.
+
+iter_items() yields each item of an array as soon as it has arrived, so rows
+can be built while the rest of a page downloads and the whole body is never
+held at once. ijson is used if it is installed; otherwise items are decoded
+with the standard library as they complete.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import codecs
+import json
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+# bytes read from the network at a time
+chunk_size = 64 * 1024
+
+_whitespace = ' \t\n\r'
+_delimiters = _whitespace + ',]'
+
+
+def iter_chunks(resp, size=chunk_size):
+    """
+    Yield the body of `resp` in chunks of bytes, reading it if unread.
+    """
+    if getattr(resp, '_content', False) is not False:
+        # already read, e.g. a recorded or canned response
+        content = resp.content
+        for start in range(0, len(content), size):
+            yield content[start:start + size]
+    else:
+        for chunk in resp.iter_content(size):
+            yield chunk
+
+
+def iter_items(chunks, use_ijson=None):
+    """
+    Yield the items of the JSON array whose UTF-8 bytes are `chunks`.
+    """
+    if use_ijson is None:
+        use_ijson = ijson is not None
+    if use_ijson:
+        return _ijson_items(chunks)
+    return _decoded_items(chunks)
+
+
+class _ChunkReader(object):
+    """
+    A file-like view of an iterable of byte chunks, for ijson.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _ijson_items(chunks):
+    reader = _ChunkReader(chunks)
+    try:
+        items = ijson.items(reader, 'item', use_float=True)
+    except TypeError:
+        # ijson before 3.1 decodes numbers with fractions as Decimals
+        items = ijson.items(reader, 'item')
+    for item in items:
+        yield item
+
+
+def _decoded_items(chunks):
+    """
+    Yield array items with the standard library, decoding each once all of
+    its bytes and the delimiter following it have arrived.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    text = ''
+    pos = 0
+    started = finished = False
+
+    while True:
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+            text += utf8.decode(b'', final=True)
+        else:
+            text += utf8.decode(chunk)
+
+        while True:
+            while pos < len(text) and text[pos] in _whitespace:
+                pos += 1
+            if pos == len(text):
+                break
+            char = text[pos]
+            if not started:
+                if char != '[':
+                    raise ValueError('Expected a JSON array at %r' % char)
+                started = True
+                pos += 1
+            elif char == ']':
+                return
+            elif char == ',':
+                pos += 1
+            else:
+                try:
+                    item, end = decoder.raw_decode(text, pos)
+                except ValueError:
+                    if finished:
+                        raise
+                    break
+                # a number may continue into the next chunk, so an item is
+                # only complete once the delimiter after it has arrived.
+                complete = end < len(text) and text[end] in _delimiters
+                if not (complete or finished):
+                    break
+                pos = end
+                yield item
+
+        if finished:
+            raise ValueError('Unterminated JSON array')
+        # drop what has been decoded, so memory use follows one item
+        text, pos = text[pos:], 0
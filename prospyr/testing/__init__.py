@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# flake8: noqa
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from prospyr.testing.budget import RequestBudget, assert_max_requests
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+from collections import namedtuple
+
+from prospyr import connection
+from prospyr.instrument import Instrument
+from prospyr.util import encode_typename
+
+LoggedRequest = namedtuple(encode_typename('LoggedRequest'),
+                           'method,url,from_cache')
+
+# attributes of a Connection which send requests, if replaced on the
+# instance (e.g. by a mock); otherwise they send through http_method.
+_verbs = ('get', 'post', 'put', 'patch', 'delete', 'options')
+
+
+class _Counted(object):
+    """
+    Call `fn`, logging the call first. Other attributes are those of `fn`, so
+    mocks can still be asserted against.
+    """
+
+    def __init__(self, fn, log):
+        self._fn = fn
+        self._log = log
+
+    def __call__(self, method, url, *args, **kwargs):
+        self._log(method, url)
+        return self._fn(method, url, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._fn, name)
+
+
+class _CountedVerb(_Counted):
+
+    def __init__(self, verb, fn, log):
+        super(_CountedVerb, self).__init__(fn, log)
+        self._verb = verb
+
+    def __call__(self, url, *args, **kwargs):
+        self._log(self._verb, url)
+        return self._fn(url, *args, **kwargs)
+
+
+class _CacheHits(Instrument):
+
+    def __init__(self, log):
+        self._log = log
+
+    def after_request(self, event):
+        if event.from_cache:
+            self._log(event.method, event.url, from_cache=True)
+
+
+class RequestBudget(object):
+    """
+    Count the requests made by a connection, failing if over budget.
+
+    Use through assert_max_requests().
+    """
+
+    def __init__(self, max_requests, using='default', max_cache_hits=None):
+        self.max_requests = max_requests
+        self.max_cache_hits = max_cache_hits
+        self.using = using
+        self.log = []
+        self._lock = threading.Lock()
+
+    @property
+    def requests(self):
+        return [entry for entry in self.log if not entry.from_cache]
+
+    @property
+    def cache_hits(self):
+        return [entry for entry in self.log if entry.from_cache]
+
+    def _record(self, method, url, from_cache=False):
+        with self._lock:
+            self.log.append(LoggedRequest(method.upper(), str(url),
+                                          from_cache))
+
+    def __enter__(self):
+        conn = self._conn = connection.get(self.using)
+        self._replaced = {}
+        for name in ('http_method', ) + _verbs:
+            if name in vars(conn):
+                self._replaced[name] = vars(conn)[name]
+        conn.http_method = _Counted(conn.http_method, self._record)
+        for name in _verbs:
+            if name in self._replaced:
+                counted = _CountedVerb(name, self._replaced[name],
+                                       self._record)
+                setattr(conn, name, counted)
+        self._instrument = _CacheHits(self._record)
+        conn.instruments.append(self._instrument)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        conn = self._conn
+        conn.instruments.remove(self._instrument)
+        del conn.http_method
+        for name, value in self._replaced.items():
+            setattr(conn, name, value)
+
+        if exc_type is None:
+            self.check()
+
+    def check(self):
+        """
+        Raise AssertionError, listing every request, if over budget.
+        """
+        problems = []
+        if len(self.requests) > self.max_requests:
+            problems.append('{n} requests were made; at most {max} were '
+                            'expected'.format(n=len(self.requests),
+                                              max=self.max_requests))
+        if (self.max_cache_hits is not None and
+                len(self.cache_hits) > self.max_cache_hits):
+            problems.append('{n} responses came from cache; at most {max} '
+                            'were expected'.format(n=len(self.cache_hits),
+                                                   max=self.max_cache_hits))
+        if problems:
+            raise AssertionError('\n'.join(problems + [self.format_log()]))
+
+    def format_log(self):
+        lines = ['Requests using connection "%s":' % self.using]
+        for number, (method, url, from_cache) in enumerate(self.log, 1):
+            lines.append('{number:4}. {method} {url}{cached}'.format(
+                number=number, method=method, url=url,
+                cached=' (cache hit)' if from_cache else ''))
+        return '\n'.join(lines)
+
+
+def assert_max_requests(n, using='default', max_cache_hits=None):
+    """
+    Assert that at most `n` requests are made using the connection `using`.
+
+    Use as a context manager. GET, POST, PUT, PATCH and DELETE requests are
+    counted, including those of verb methods replaced by mocks. Responses
+    from cache are counted separately, and limited only if `max_cache_hits`
+    is argued. On failure, the AssertionError lists every request made.
+
+        with prospyr.assert_max_requests(3):
+            Person.objects.get(id=1)
+    """
+    return RequestBudget(n, using=using, max_cache_hits=max_cache_hits)
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+from six.moves import BaseHTTPServer, socketserver
+
+from prospyr import resources
+from prospyr.testing import generate
+
+# searchable resources, and how many of each are made by default
+default_counts = OrderedDict([
+    ('person', 200),
+    ('company', 50),
+    ('opportunity', 100),
+    ('activity', 200),
+    ('task', 100),
+    ('lead', 50),
+])
+
+_resource_classes = {
+    'person': resources.Person,
+    'company': resources.Company,
+    'opportunity': resources.Opportunity,
+    'activity': resources.Activity,
+    'task': resources.Task,
+    'lead': resources.Lead,
+}
+
+_pipelines = [
+    {'id': 1, 'name': 'Sales', 'stages': [
+        {'id': 1, 'name': 'Qualified', 'pipeline_id': 1},
+        {'id': 2, 'name': 'Proposal', 'pipeline_id': 1},
+        {'id': 3, 'name': 'Negotiation', 'pipeline_id': 1},
+    ]},
+    {'id': 2, 'name': 'Renewals', 'stages': [
+        {'id': 4, 'name': 'Due', 'pipeline_id': 2},
+        {'id': 5, 'name': 'Renewed', 'pipeline_id': 2},
+    ]},
+]
+_activity_types = {
+    'user': [
+        {'id': 0, 'category': 'user', 'name': 'Note', 'is_disabled': False,
+         'count_as_interaction': False},
+        {'id': 1, 'category': 'user', 'name': 'Phone Call',
+         'is_disabled': False, 'count_as_interaction': True},
+        {'id': 2, 'category': 'user', 'name': 'Meeting',
+         'is_disabled': False, 'count_as_interaction': True},
+    ],
+    'system': [
+        {'id': 3, 'category': 'system', 'name': 'Property Changed',
+         'is_disabled': False, 'count_as_interaction': False},
+    ],
+}
+_loss_reasons = [{'id': 1, 'name': 'Price'}, {'id': 2, 'name': 'Timing'}]
+_customer_sources = [{'id': id, 'name': name} for id, name in
+                     enumerate(('Email', 'Referral', 'Web', 'Event'), 1)]
+
+# fields ProsperWorks fills in when a record is created without them
+_create_defaults = {
+    'opportunity': {'win_probability': 0},
+    'task': {'priority': 'None', 'status': 'Open'},
+    'lead': {'status': 'New'},
+}
+
+# the control parameters of a search; anything else filters
+_search_params = {'page_size', 'page_number', 'sort_by', 'sort_direction'}
+_version_prefix = re.compile(r'^.*?/v\d+/')
+
+
+def _route(path):
+    """
+    A regex matching `path` from a resource's Meta, with or without its
+    trailing slash. An {id} placeholder becomes a named group.
+    """
+    # re.escape() escapes braces on some Pythons but not others
+    pattern = re.sub(r'\\?\{id\\?\}', r'(?P<id>\\d+)',
+                     re.escape(path.strip('/')))
+    return re.compile('^%s/?$' % pattern)
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.fake._handle(self, 'GET')
+
+    def do_POST(self):
+        self.server.fake._handle(self, 'POST')
+
+    def do_PUT(self):
+        self.server.fake._handle(self, 'PUT')
+
+    def do_DELETE(self):
+        self.server.fake._handle(self, 'DELETE')
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class FakeProsperWorks(object):
+    """
+    A local HTTP server standing in for the ProsperWorks API.
+
+    The search, detail, create, update, delete, list and fetch_by_email
+    endpoints used by prospyr.resources are served from synthetic records,
+    `counts` of each searchable resource made from `seed`. Records refer to
+    one another, so related and nested fetches succeed.
+
+    Every request waits `latency` seconds. A fraction `rate_limit_rate` of
+    requests are refused with 429 Too Many Requests, and a fraction
+    `error_rate` fail with a 5xx error; fail_next() injects failures
+    deterministically instead. As with ProsperWorks, searches return at most
+    `max_page_size` rows per page.
+
+        with FakeProsperWorks(latency=0.05) as fake:
+            cn = prospyr.connect(email='...', token='...', url=fake.url)
+    """
+
+    def __init__(self, counts=None, seed=0, latency=0, rate_limit_rate=0,
+                 error_rate=0, max_page_size=200, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.max_page_size = max_page_size
+        self.requests = []
+        self._rng = random.Random(seed)
+        self._failures = deque()
+        self._lock = threading.Lock()
+        self._records = self._generate(default_counts if counts is None
+                                       else counts, seed)
+        # a blank record of each kind, which created records start from
+        self._blanks = {
+            kind: {key: [] if isinstance(value, list) else None
+                   for key, value in generate.rows(kind, 1)[0].items()}
+            for kind in self._records
+        }
+        self._routes = self._build_routes()
+        self._server = _Server((host, port), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        The URL to argue to prospyr.connect().
+        """
+        host, port = self._server.server_address[:2]
+        return 'http://{host}:{port}/developer_api/'.format(host=host,
+                                                            port=port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def records(self, kind):
+        """
+        The rows of resource `kind`, e.g. 'person', by id.
+        """
+        return self._records[kind]
+
+    def fail_next(self, status, times=1):
+        """
+        Answer the next `times` requests with HTTP `status`, e.g. 429.
+        """
+        with self._lock:
+            self._failures.extend([status] * times)
+
+    def respond(self, method, path, body=None):
+        """
+        Return the status, JSON body and headers answering a request.
+
+        Injected latency and failures are not applied.
+        """
+        path = _version_prefix.sub('', path.split('?')[0], count=1)
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                args = match.groupdict()
+                if 'id' in args:
+                    args['id'] = int(args['id'])
+                return handler(body=body, **args)
+        return 404, {'message': 'No route for %s %s' % (method, path)}, {}
+
+    def _handle(self, handler, method):
+        length = int(handler.headers.get('Content-Length') or 0)
+        raw = handler.rfile.read(length) if length else b''
+        body = json.loads(raw.decode('utf-8')) if raw else None
+
+        with self._lock:
+            self.requests.append((method, handler.path))
+        if self.latency:
+            time.sleep(self.latency)
+        failure = self._failure()
+        if failure is not None:
+            status, payload, headers = failure
+        else:
+            status, payload, headers = self.respond(method, handler.path,
+                                                    body)
+
+        content = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        headers = dict(headers)
+        headers['Content-Type'] = 'application/json'
+        headers['Content-Length'] = str(len(content))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def _failure(self):
+        with self._lock:
+            if self._failures:
+                status = self._failures.popleft()
+            elif self._rng.random() < self.rate_limit_rate:
+                status = 429
+            elif self._rng.random() < self.error_rate:
+                status = self._rng.choice((500, 502, 503))
+            else:
+                return None
+        headers = {'Retry-After': '1'} if status == 429 else {}
+        return status, {'message': 'Injected failure'}, headers
+
+    def _generate(self, counts, seed):
+        refs = dict(counts, user=20, contact_type=5,
+                    customer_source=len(_customer_sources))
+        identifier_types = tuple(kind for kind in ('person', 'company', 'lead')
+                                 if counts.get(kind))
+        records = {'user': generate.rows('user', 20, seed=seed)}
+        for kind, count in counts.items():
+            records[kind] = generate.rows(
+                kind, count, seed=seed, refs=refs,
+                identifier_types=(identifier_types or
+                                  generate.default_identifier_types)
+            )
+        self._link(records, random.Random(seed))
+        return {kind: OrderedDict((row['id'], row) for row in rows)
+                for kind, rows in records.items()}
+
+    @staticmethod
+    def _link(records, rng):
+        """
+        Point opportunities at a pipeline stage of their pipeline.
+        """
+        stages = [stage for pipeline in _pipelines
+                  for stage in pipeline['stages']]
+        for row in records.get('opportunity', []):
+            stage = rng.choice(stages)
+            row.update(pipeline_id=stage['pipeline_id'],
+                       pipeline_stage_id=stage['id'])
+
+    def _build_routes(self):
+        routes = []
+        for kind, resource_cls in _resource_classes.items():
+            meta = resource_cls.Meta
+            routes.extend([
+                ('POST', _route(meta.search_path), self._searcher(kind)),
+                ('POST', _route(meta.create_path), self._creator(kind)),
+                ('GET', _route(meta.detail_path), self._reader(kind)),
+                ('PUT', _route(meta.detail_path), self._updater(kind)),
+                ('DELETE', _route(meta.detail_path), self._deleter(kind)),
+            ])
+        fetch_by_email = resources.Person.Meta.fetch_by_email_path
+        routes.append(('POST', _route(fetch_by_email), self._fetch_by_email))
+
+        stages = [stage for pipeline in _pipelines
+                  for stage in pipeline['stages']]
+        lists = [
+            (resources.User, lambda: list(self._records['user'].values())),
+            (resources.Pipeline, lambda: _pipelines),
+            (resources.PipelineStage, lambda: stages),
+            (resources.LossReason, lambda: _loss_reasons),
+            (resources.CustomerSource, lambda: _customer_sources),
+            (resources.ActivityType, lambda: _activity_types),
+            (resources.Webhook, lambda: []),
+        ]
+        for resource_cls, rows in lists:
+            routes.append(('GET', _route(resource_cls.Meta.list_path),
+                           self._lister(rows)))
+        routes.append(('GET', _route(resources.Account.Meta.detail_path),
+                       lambda body: (200, {'id': 1, 'name': 'Fake Co'}, {})))
+        return routes
+
+    @staticmethod
+    def _not_found():
+        return 404, {'success': False, 'status': 404,
+                     'message': 'Resource not found'}, {}
+
+    def _searcher(self, kind):
+        def search(body):
+            query = body or {}
+            page_size = min(int(query.get('page_size', 20)),
+                            self.max_page_size)
+            page_number = int(query.get('page_number', 1))
+            with self._lock:
+                rows = list(self._records[kind].values())
+            for key, value in query.items():
+                if key not in _search_params:
+                    rows = [row for row in rows if _matches(row, key, value)]
+            sort_by = query.get('sort_by')
+            if sort_by:
+                reverse = query.get('sort_direction') == 'desc'
+                rows.sort(key=lambda row: (row.get(sort_by) is None,
+                                           row.get(sort_by)),
+                          reverse=reverse)
+            start = (page_number - 1) * page_size
+            return 200, rows[start:start + page_size], {}
+        return search
+
+    def _creator(self, kind):
+        def create(body):
+            with self._lock:
+                records = self._records[kind]
+                now = int(time.time())
+                row = dict(self._blanks[kind], date_created=now,
+                           date_modified=now)
+                row.update(_create_defaults.get(kind, {}))
+                if kind == 'activity':
+                    row['activity_date'] = now
+                row.update(body or {})
+                row['id'] = max(records or [0]) + 1
+                records[row['id']] = row
+            return 200, row, {}
+        return create
+
+    def _reader(self, kind):
+        def read(body, id):
+            row = self._records[kind].get(id)
+            if row is None:
+                return self._not_found()
+            return 200, row, {}
+        return read
+
+    def _updater(self, kind):
+        def update(body, id):
+            with self._lock:
+                row = self._records[kind].get(id)
+                if row is None:
+                    return self._not_found()
+                row.update(body or {})
+                row['id'] = id
+                row['date_modified'] = int(time.time())
+            return 200, row, {}
+        return update
+
+    def _deleter(self, kind):
+        def delete(body, id):
+            with self._lock:
+                row = self._records[kind].pop(id, None)
+            if row is None:
+                return self._not_found()
+            return 200, {'id': id, 'is_deleted': True}, {}
+        return delete
+
+    def _lister(self, rows):
+        def list_(body):
+            return 200, rows(), {}
+        return list_
+
+    def _fetch_by_email(self, body):
+        email = (body or {}).get('email')
+        with self._lock:
+            people = list(self._records['person'].values())
+        for row in people:
+            if any(e['email'] == email for e in row.get('emails', [])):
+                return 200, row, {}
+        return self._not_found()
+
+
+def _matches(row, key, value):
+    """
+    Whether `row` passes search filter `key` = `value`.
+
+    Only filters naming a scalar field of `row` are applied; ProsperWorks'
+    other filters are ignored.
+    """
+    field = row.get(key)
+    if key not in row or isinstance(field, (dict, list)):
+        return True
+    if isinstance(value, list):
+        return field in value
+    return field == value
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic ProsperWorks API rows, the same for the same seed.
+
+Rows refer to other records by id, e.g. a person's company_id. `refs` sets
+how many distinct ids of each kind are referred to, from 1 upwards; kinds
+missing from `refs` are referred to as None. Activities' parents are
+identifiers of one of `identifier_types`.
+
+    for row in generate.iter_rows('person', 10 ** 6, refs={'company': 50}):
+        ...
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import random
+
+from six.moves import range
+
+_first = ('Ada', 'Ben', 'Cleo', 'Dev', 'Erin', 'Finn', 'Grace', 'Hemi')
+_last = ('Ngata', 'Lee', 'Smith', 'Okafor', 'Rossi', 'Kim', 'Tui', 'Brown')
+_words = ('ltd', 'group', 'labs', 'partners', 'works', 'co', 'systems')
+_cities = (('Wellington', 'WLG'), ('Auckland', 'AKL'), ('Sydney', 'NSW'),
+           ('San Francisco', 'CA'))
+_tags = ('High Value', 'New Business', 'Renewal', 'Partner', 'Churn Risk')
+_since = 1420070400  # 2015-01-01
+
+# how many distinct ids of each kind rows refer to, by default
+default_refs = {
+    'user': 20,
+    'person': 10 ** 6,
+    'company': 10 ** 6,
+    'lead': 10 ** 6,
+    'contact_type': 5,
+    'customer_source': 10,
+    'pipeline': 3,
+    'pipeline_stage': 12,
+}
+# leads are placeholders, so no nested fetch is made
+default_identifier_types = ('lead',)
+
+
+def _ref(rng, refs, kind):
+    count = refs.get(kind)
+    return rng.randint(1, count) if count else None
+
+
+def _identifier(rng, refs, types):
+    type_ = rng.choice(types)
+    id = _ref(rng, refs, type_)
+    return {'type': type_ if id else None, 'id': id}
+
+
+def _name(rng):
+    return '%s %s' % (rng.choice(_first), rng.choice(_last))
+
+
+def _company_name(rng):
+    return '%s %s' % (rng.choice(_last), rng.choice(_words))
+
+
+def _address(rng):
+    city, state = rng.choice(_cities)
+    return {
+        'street': '%s Main Street' % rng.randint(1, 999),
+        'city': city,
+        'state': state,
+        'postal_code': '%05d' % rng.randint(0, 99999),
+        'country': 'US',
+    }
+
+
+def _dates(rng):
+    created = _since + rng.randint(0, 10 ** 8)
+    return {
+        'date_created': created,
+        'date_modified': created + rng.randint(0, 10 ** 7),
+    }
+
+
+def _contact_details(rng, name):
+    slug = name.lower().replace(' ', '.')
+    return {
+        'phone_numbers': [
+            {'number': '555-%04d' % rng.randint(0, 9999),
+             'category': rng.choice(('work', 'mobile'))}
+            for _ in range(rng.randint(0, 2))
+        ],
+        'socials': [{'url': 'https://twitter.com/%s' % slug,
+                     'category': 'twitter'}],
+        'websites': [{'url': 'https://%s.example.org' % slug,
+                      'category': 'work'}],
+        'tags': rng.sample(_tags, rng.randint(0, 3)),
+    }
+
+
+def user(rng, id, refs, identifier_types):
+    name = _name(rng)
+    return {
+        'id': id,
+        'name': name,
+        'email': '%s@example.org' % name.lower().replace(' ', '.'),
+    }
+
+
+def person(rng, id, refs, identifier_types):
+    name = _name(rng)
+    row = {
+        'id': id,
+        'name': name,
+        'address': _address(rng),
+        'assignee_id': _ref(rng, refs, 'user'),
+        'company_id': _ref(rng, refs, 'company'),
+        'company_name': _company_name(rng),
+        'contact_type_id': _ref(rng, refs, 'contact_type'),
+        'details': None,
+        'emails': [{'email': '%s@example.org' % name.lower().replace(' ', '.'),
+                    'category': 'work'}],
+        'title': rng.choice((None, 'CEO', 'Engineer', 'Buyer')),
+    }
+    row.update(_contact_details(rng, name))
+    row.update(_dates(rng))
+    return row
+
+
+def company(rng, id, refs, identifier_types):
+    name = _company_name(rng)
+    row = {
+        'id': id,
+        'name': name,
+        'address': _address(rng),
+        'assignee_id': _ref(rng, refs, 'user'),
+        'contact_type_id': _ref(rng, refs, 'contact_type'),
+        'details': None,
+        'email_domain': '%s.example.org' % name.lower().replace(' ', '-'),
+    }
+    row.update(_contact_details(rng, name))
+    row.update(_dates(rng))
+    return row
+
+
+def opportunity(rng, id, refs, identifier_types):
+    row = {
+        'id': id,
+        'name': '%s deal' % _company_name(rng),
+        'assignee_id': _ref(rng, refs, 'user'),
+        'close_date': _since + rng.randint(0, 10 ** 8),
+        'company_id': _ref(rng, refs, 'company'),
+        'company_name': _company_name(rng),
+        'customer_source_id': _ref(rng, refs, 'customer_source'),
+        'details': None,
+        'loss_reason_id': None,
+        'monetary_value': rng.randint(0, 10 ** 6),
+        'pipeline_id': _ref(rng, refs, 'pipeline'),
+        'pipeline_stage_id': _ref(rng, refs, 'pipeline_stage'),
+        'primary_contact_id': _ref(rng, refs, 'person') or 0,
+        'priority': rng.choice(('None', 'Low', 'Medium', 'High')),
+        'stage': rng.choice(('Open', 'Won', 'Lost', 'Abandoned')),
+        'tags': rng.sample(_tags, rng.randint(0, 3)),
+        'win_probability': rng.randint(0, 100),
+    }
+    row.update(_dates(rng))
+    return row
+
+
+def activity(rng, id, refs, identifier_types):
+    return {
+        'id': id,
+        'type': {'id': rng.choice((0, 1, 2)), 'category': 'user'},
+        'parent': _identifier(rng, refs, identifier_types),
+        'details': 'Called about the %s renewal' % _company_name(rng),
+        'user_id': _ref(rng, refs, 'user'),
+        'activity_date': _since + rng.randint(0, 10 ** 8),
+    }
+
+
+def task(rng, id, refs, identifier_types):
+    row = {
+        'id': id,
+        'name': 'Follow up with %s' % _name(rng),
+        'related_resource': {'type': None, 'id': None},
+        'assignee_id': _ref(rng, refs, 'user'),
+        'due_date': _since + rng.randint(0, 10 ** 8),
+        'reminder_date': None,
+        'completed_date': None,
+        'priority': rng.choice(('None', 'High')),
+        'status': rng.choice(('Open', 'Completed')),
+        'details': None,
+        'tags': rng.sample(_tags, rng.randint(0, 2)),
+    }
+    row.update(_dates(rng))
+    return row
+
+
+def lead(rng, id, refs, identifier_types):
+    name = _name(rng)
+    row = {
+        'id': id,
+        'name': name,
+        'address': _address(rng),
+        'assignee_id': _ref(rng, refs, 'user'),
+        'company_name': _company_name(rng),
+        'customer_source_id': _ref(rng, refs, 'customer_source'),
+        'details': None,
+        'email': {'email': '%s@example.org' % name.lower().replace(' ', '.'),
+                  'category': 'work'},
+        'monetary_value': rng.randint(0, 10 ** 5),
+        'status': rng.choice(('New', 'Unqualified', 'Contacted')),
+        'title': None,
+    }
+    row.update(_contact_details(rng, name))
+    row.update(_dates(rng))
+    return row
+
+
+makers = {
+    'user': user,
+    'person': person,
+    'company': company,
+    'opportunity': opportunity,
+    'activity': activity,
+    'task': task,
+    'lead': lead,
+}
+
+
+def iter_rows(kind, n, seed=0, start_id=1, refs=None,
+              identifier_types=default_identifier_types):
+    """
+    Yield `n` synthetic rows of resource `kind`, e.g. 'person', one by one.
+
+    Rows are made as they are consumed, so any number can be streamed.
+    """
+    rng = random.Random(seed)
+    make = makers[kind]
+    refs = default_refs if refs is None else refs
+    for id in range(start_id, start_id + n):
+        yield make(rng, id, refs, identifier_types)
+
+
+def rows(kind, n, seed=0, start_id=1, refs=None,
+         identifier_types=default_identifier_types):
+    """
+    A list of `n` synthetic rows of resource `kind`, e.g. 'person'.
+    """
+    return list(iter_rows(kind, n, seed=seed, start_id=start_id, refs=refs,
+                          identifier_types=identifier_types))
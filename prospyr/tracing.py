@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from contextlib import contextmanager
+
+_tracer = None
+
+
+class NoOpSpan(object):
+    """
+    A span which records nothing.
+    """
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def is_recording(self):
+        return False
+
+    def end(self):
+        pass
+
+
+_noop_span = NoOpSpan()
+
+
+class NoOpTracer(object):
+    """
+    The default tracer, which records nothing.
+
+    Tracers offer the subset of the OpenTelemetry Tracer interface Prospyr
+    uses, plus use_span(), which makes a span current without ending it.
+    Spans must support set_attribute() and end().
+    """
+
+    def start_span(self, name, attributes=None):
+        return _noop_span
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        yield _noop_span
+
+    @contextmanager
+    def use_span(self, span):
+        yield span
+
+
+_noop_tracer = NoOpTracer()
+
+
+class OpenTelemetryTracer(object):
+    """
+    Adapt an OpenTelemetry tracer, e.g. opentelemetry.trace.get_tracer(...).
+    """
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def start_span(self, name, attributes=None):
+        return self.tracer.start_span(name, attributes=attributes)
+
+    def start_as_current_span(self, name, attributes=None):
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+    def use_span(self, span):
+        from opentelemetry import trace
+        return trace.use_span(span, end_on_exit=False)
+
+
+def set_tracer(tracer):
+    """
+    Trace Prospyr with `tracer`. Argue None to stop tracing.
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer():
+    """
+    The tracer set with set_tracer(), or a NoOpTracer.
+    """
+    return _tracer or _noop_tracer
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Transports send a connection's HTTP requests.
+
+The default Transport sends them with the connection's requests.Session.
+RecordingTransport also writes each request and its response to a file, and
+ReplayTransport answers requests from such a file without any network:
+
+    prospyr.connect(..., transport=RecordingTransport('activity.jsonl.gz'))
+    # ... run the workload against ProsperWorks, then close the recording
+
+    prospyr.connect(..., transport=ReplayTransport('activity.jsonl.gz'))
+    # ... run the same workload offline, as often as you like
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import gzip
+import io
+import json
+import threading
+import time
+from collections import deque
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from urlobject import URLObject
+
+from prospyr.exceptions import UnrecordedRequest
+
+# the response headers worth recording.
+_kept_headers = ('Content-Type', 'Retry-After')
+
+
+def _open(path, mode):
+    # recordings ending in .gz are compressed.
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return io.open(path, mode + 'b')
+
+
+def _body(kwargs):
+    """
+    The JSON body of a request, whether encoded yet or not.
+    """
+    data = kwargs.get('data')
+    if data is not None:
+        return json.loads(data.decode('utf-8'))
+    return kwargs.get('json')
+
+
+def _key(method, url, body):
+    """
+    Identify a request by method, URL path and query, and JSON body.
+
+    Hosts are ignored, so a recording replays against any API URL.
+    """
+    url = URLObject(url)
+    path = url.path + ('?' + url.query if url.query else '')
+    return '{method} {path} {body}'.format(
+        method=method.upper(),
+        path=path,
+        body=json.dumps(body, sort_keys=True, separators=(',', ':'))
+    )
+
+
+class Transport(object):
+    """
+    Send requests with `session`. Subclasses may send them another way.
+    """
+
+    def send(self, session, method, url, *args, **kwargs):
+        return getattr(session, method)(url, *args, **kwargs)
+
+    def close(self):
+        pass
+
+
+class RecordingTransport(Transport):
+    """
+    Send requests with `transport`, recording each exchange to `path`.
+
+    One JSON line is written per exchange: the request method, URL and body,
+    and the response status, a few headers, body and seconds taken. Request
+    headers, which carry credentials, are not recorded. Close the transport
+    when the workload is done to flush the file.
+    """
+
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = Transport() if transport is None else transport
+        self._file = _open(path, 'w')
+        self._lock = threading.Lock()
+
+    def send(self, session, method, url, *args, **kwargs):
+        start = time.time()
+        resp = self.transport.send(session, method, url, *args, **kwargs)
+        elapsed = time.time() - start
+        exchange = {
+            'method': method,
+            'url': url,
+            'body': _body(kwargs),
+            'status': resp.status_code,
+            'headers': {name: resp.headers[name] for name in _kept_headers
+                        if name in resp.headers},
+            'content': resp.content.decode('utf-8'),
+            'elapsed': round(elapsed, 6),
+        }
+        line = json.dumps(exchange, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line.encode('utf-8'))
+        return resp
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Answer requests with the responses recorded to `path`.
+
+    Requests are matched by method, URL path and query, and JSON body. A
+    request made several times is answered with each of its recorded
+    responses in turn, then the last one again. UnrecordedRequest is raised
+    for requests which were never recorded.
+
+    With `timings`, each response is delayed by the time it originally took,
+    multiplied by `timings` if it is a number.
+    """
+
+    def __init__(self, path, timings=False):
+        self.path = path
+        self.timings = timings
+        self._exchanges = {}
+        self._lock = threading.Lock()
+        with _open(path, 'r') as src:
+            for line in src:
+                exchange = json.loads(line.decode('utf-8'))
+                key = _key(exchange['method'], exchange['url'],
+                           exchange['body'])
+                self._exchanges.setdefault(key, deque()).append(exchange)
+
+    def send(self, session, method, url, *args, **kwargs):
+        key = _key(method, url, _body(kwargs))
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                raise UnrecordedRequest('%s was not recorded in %s'
+                                        % (key, self.path))
+            exchange = (exchanges.popleft() if len(exchanges) > 1
+                        else exchanges[0])
+        if self.timings:
+            scale = 1 if self.timings is True else self.timings
+            time.sleep(exchange['elapsed'] * scale)
+        return self._response(url, exchange)
+
+    @staticmethod
+    def _response(url, exchange):
+        resp = Response()
+        resp.url = url
+        resp.status_code = exchange['status']
+        resp.headers = CaseInsensitiveDict(exchange['headers'])
+        resp._content = exchange['content'].encode('utf-8')
+        resp.elapsed = datetime.timedelta(seconds=exchange['elapsed'])
+        return resp
@@ -87,3 +87,19 @@ def encode_typename(name):
     if sys.version_info < (3, 0, 0):
         return name.encode('ascii')
     return name
+
+
+_before_api_path = re.compile(r'^.*?/v\d+/')
+_after_path = re.compile(r'[?#].*$')
+_id_segment = re.compile(r'(?<=/)\d+(?=/|$)|^\d+(?=/|$)')
+
+
+def url_template(url):
+    """
+    Reduce `url` to a template shared by similar URLs.
+
+    The API base URL, query string and fragment are dropped and numeric path
+    segments become {id}, e.g. .../v1/people/1/?q=x becomes people/{id}/.
+    """
+    path = _after_path.sub('', _before_api_path.sub('', url, count=1))
+    return _id_segment.sub('{id}', path)
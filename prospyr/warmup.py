@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import io
+import json
+import os
+import threading
+from logging import getLogger
+
+import arrow
+from requests import codes
+
+from prospyr.cache import CachedResponse
+from prospyr.exceptions import ApiError
+from prospyr.resources import (ActivityType, CustomerSource, LossReason,
+                               Pipeline, PipelineStage, User)
+from prospyr.util import seconds
+
+logger = getLogger(__name__)
+
+# list-only reference data which most applications need sooner or later.
+default_resources = (ActivityType, CustomerSource, LossReason, Pipeline,
+                     PipelineStage, User)
+
+
+def warm(conn, resources=default_resources, snapshot=None,
+         snapshot_max_age=seconds(days=1)):
+    """
+    Fetch list-only `resources` on `conn` ahead of time.
+
+    Lists are fetched concurrently, then loaded into the URL cache and the
+    resources' managers, so later lookups by id need no requests. A dict of
+    resource class to results_by_id() is returned.
+
+    No list is requested more than once, whatever the URL cache.
+
+    If `snapshot` is the path of a file, lists saved there less than
+    `snapshot_max_age` seconds ago are used instead of fetching them, and
+    the lists are saved there afterwards for next time.
+    """
+    paths = {resource_cls.Meta.list_path for resource_cls in resources}
+    snapshotted = _load_snapshot(conn, snapshot, snapshot_max_age)
+    bodies = {path: body for path, body in snapshotted.items()
+              if path in paths}
+    bodies.update(_fetch(conn, paths - set(bodies)))
+
+    for path, body in bodies.items():
+        cached = CachedResponse(status_code=codes.ok, headers={}, body=body,
+                                content=None)
+        conn.cache.set(conn.build_absolute_url(path), cached,
+                       max_age=conn.cache_max_age)
+
+    warmed = {}
+    for resource_cls in resources:
+        manager = resource_cls.objects.use(conn.name)
+        body = bodies[resource_cls.Meta.list_path]
+        warmed[resource_cls] = manager.load_results(body)
+
+    if snapshot is not None:
+        snapshotted.update(bodies)
+        _save_snapshot(conn, snapshot, snapshotted)
+    return warmed
+
+
+def _fetch(conn, paths):
+    """
+    GET the lists at `paths` concurrently, returning a dict of path to body.
+    """
+    responses = {}
+
+    def fetch(path):
+        try:
+            url = conn.build_absolute_url(path)
+            responses[path] = conn.http_method('get', url)
+        except Exception as ex:
+            responses[path] = ex
+
+    threads = [threading.Thread(target=fetch, args=(path, ))
+               for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    bodies = {}
+    for path, resp in responses.items():
+        if isinstance(resp, Exception):
+            raise resp
+        if resp.status_code != codes.ok:
+            raise ApiError(resp.status_code, resp.text)
+        bodies[path] = conn.decode(resp)
+    logger.debug('Fetched %s for warming', ', '.join(sorted(bodies)))
+    return bodies
+
+
+def _load_snapshot(conn, path, max_age):
+    if path is None or not os.path.exists(path):
+        return {}
+    with io.open(path, encoding='utf-8') as src:
+        snapshot = json.load(src)
+    too_old = snapshot['saved'] + max_age <= arrow.utcnow().timestamp
+    other_account = (snapshot['api_url'] != conn.api_url or
+                     snapshot['email'] != conn.email)
+    if too_old or other_account:
+        logger.debug('Ignoring snapshot %s', path)
+        return {}
+    return snapshot['bodies']
+
+
+def _save_snapshot(conn, path, bodies):
+    snapshot = {
+        'saved': arrow.utcnow().timestamp,
+        'api_url': conn.api_url,
+        'email': conn.email,
+        'bodies': bodies,
+    }
+    # write then rename, so readers never see a partial snapshot.
+    tmp_path = '{path}.{pid}.tmp'.format(path=path, pid=os.getpid())
+    with io.open(tmp_path, mode='wb') as dest:
+        dest.write(json.dumps(snapshot).encode('utf-8'))
+    os.rename(tmp_path, path)
@@ -46,9 +46,14 @@ setup(
         'Programming Language :: Python :: 3.5',
     ],
     keywords='ProsperWorks',
-    packages=['prospyr'],
+    packages=['prospyr', 'prospyr.testing'],
     install_requires=requirements,
-    extras_require={'dev': dev_requirements},
+    extras_require={
+        'dev': dev_requirements,
+        'stream': ['ijson'],
+        'columns': ['numpy'],
+        'dataframe': ['pandas'],
+    },
     test_suite='nose.core.collector',
     tests_require=dev_requirements,
 )
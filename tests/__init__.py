@@ -9,7 +9,7 @@ from hashlib import sha256
 from random import random
 
 import mock
-from requests import Response
+from requests import Response, codes
 
 from prospyr.connection import _connections, connect
 
@@ -56,6 +56,16 @@ def make_cn_with_resp(method, status_code, content, name=None):
     return cn
 
 
+def json_to_resp(data, status_code=codes.ok):
+    """
+    A canned response with `data` serialised as its JSON body.
+    """
+    resp = Response()
+    resp._content = json.dumps(data).encode('utf-8')
+    resp.status_code = status_code
+    return resp
+
+
 def make_cn_with_resps(url_map, name=None):
     name = name or sha256(str(random()).encode()).hexdigest()
     cn = connect(email='foo', token='bar', name=name)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import defaultdict
+
+import mock
+from nose.plugins.skip import SkipTest
+
+from prospyr import analytics
+from prospyr.connection import connect
+from prospyr.testing import generate
+from tests import json_to_resp, reset_conns
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+rows = generate.rows('opportunity', 300, refs={'user': 4,
+                                               'pipeline_stage': 5})
+rows[0].update(monetary_value=None)
+rows[1].update(assignee_id=None)
+rows[2].update(stage=None)
+
+
+def _columns():
+    if np is None:
+        raise SkipTest('numpy is not installed')
+    cn = connect(email='foo', token='bar')
+    # full pages of 100, then an empty one
+    cn.session.post = mock.Mock(side_effect=[
+        json_to_resp(rows[i:i + 100]) for i in range(0, 400, 100)
+    ])
+    columns = analytics.opportunity_columns()
+    assert cn.session.post.call_count == 4
+    return columns
+
+
+@reset_conns
+def test_grouped():
+    columns = _columns()
+
+    expected = defaultdict(list)
+    for row in rows:
+        if None not in (row['assignee_id'], row['monetary_value']):
+            expected[row['assignee_id']].append(row['monetary_value'])
+    by_assignee = analytics.grouped(columns, 'assignee_id').as_dict()
+    assert sorted(by_assignee) == sorted(expected)
+    for key, values in expected.items():
+        count, total, mean = by_assignee[key]
+        assert count == len(values)
+        assert total == sum(values)
+        assert abs(mean - sum(values) / len(values)) < 1e-6
+
+    by_stage = analytics.grouped(columns, 'stage', stages=('Won', 'Lost'))
+    assert set(by_stage.keys) == {'Won', 'Lost'}
+    assert by_stage.count.sum() == sum(
+        1 for row in rows if row['stage'] in ('Won', 'Lost') and
+        row['monetary_value'] is not None)
+
+
+@reset_conns
+def test_weighted_forecast():
+    columns = _columns()
+    open_rows = [row for row in rows if row['stage'] == 'Open' and
+                 row['monetary_value'] is not None]
+    expected = sum(row['monetary_value'] * row['win_probability'] / 100
+                   for row in open_rows)
+    assert abs(analytics.weighted_forecast(columns) - expected) < 1e-3
+
+    by_stage_id = analytics.weighted_forecast(columns, by='pipeline_stage_id')
+    assert abs(by_stage_id.sum.sum() - expected) < 1e-3
+    assert set(by_stage_id.keys) <= {1, 2, 3, 4, 5}
+
+
+@reset_conns
+def test_inactivity_histogram():
+    columns = _columns()
+    now = max(row['date_modified'] for row in rows) + 86400
+    counts, edges = analytics.inactivity_histogram(columns, now=now,
+                                                   stages=None)
+    assert counts.sum() == len(rows)
+    assert list(edges[:3]) == [0, 7, 14]
+
+    days = [(now - row['date_modified']) / 86400 for row in rows]
+    assert counts[0] == sum(1 for d in days if d < 7)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+
+import mock
+from nose.tools import assert_raises
+from requests import Response, codes
+
+import prospyr
+from prospyr.connection import connect
+from prospyr.resources import Person
+from tests import load_fixture_json, make_cn_with_resp, reset_conns
+
+
+@reset_conns
+def test_counts_mocked_verbs():
+    person = json.loads(load_fixture_json('person.json'))
+    cn = make_cn_with_resp(method='get', status_code=codes.ok,
+                           content=person, name='default')
+    mocked_get = cn.get
+
+    with prospyr.assert_max_requests(1) as budget:
+        Person.objects.get(id=1)
+        cn.get.assert_called_once_with(cn.build_absolute_url('people/1/'))
+    assert [r.method for r in budget.requests] == ['GET']
+    assert cn.get is mocked_get
+
+    with assert_raises(AssertionError) as raised:
+        with prospyr.assert_max_requests(1):
+            Person.objects.get(id=1)
+            Person.objects.get(id=2)
+    message = str(raised.exception)
+    assert '2 requests were made; at most 1 were expected' in message
+    assert '1. GET https://api.prosperworks.com/developer_api/v1/people/1/' in message  # noqa
+    assert '2. GET https://api.prosperworks.com/developer_api/v1/people/2/' in message  # noqa
+
+
+@reset_conns
+def test_cache_hits_counted_separately():
+    cn = connect(email='foo', token='bar', name='other')
+    resp = Response()
+    resp._content = b'{}'
+    resp.status_code = codes.ok
+    cn.session.get = mock.Mock(return_value=resp)
+    cn.session.put = mock.Mock(return_value=resp)
+
+    with prospyr.assert_max_requests(2, using='other') as budget:
+        cn.get('url')
+        cn.get('url')
+        cn.put('url', json={})
+    assert [r.method for r in budget.requests] == ['GET', 'PUT']
+    assert [r.method for r in budget.cache_hits] == ['GET']
+
+    with assert_raises(AssertionError) as raised:
+        with prospyr.assert_max_requests(0, using='other', max_cache_hits=0):
+            cn.get('url')
+    message = str(raised.exception)
+    assert '1 responses came from cache' in message
+    assert '1. GET url (cache hit)' in message
+
+    # the connection is left as it was
+    assert 'http_method' not in vars(cn)
+    assert cn.instruments == []
@@ -1,6 +1,16 @@
+import os
+import sys
+import tempfile
+import threading
+
 import arrow
+import mock
+from requests import Response, codes
+from urlobject import URLObject
 
-from prospyr.cache import CacheEntry, InMemoryCache, NoOpCache
+from prospyr.cache import (CachedResponse, CacheEntry, InMemoryCache,
+                           NoOpCache, RedisCache, SqliteCache,
+                           approximate_size)
 
 
 def test_inmem_set_and_get():
@@ -29,6 +39,54 @@ def test_trimmed_if_oversize():
     assert len(cache._cache) == 2
 
 
+def test_trimmed_if_over_bytes():
+    small, large = 'x', 'x' * 1000
+    cache = InMemoryCache(max_bytes=approximate_size(large) * 2)
+    for key in range(10):
+        cache.set(key, small)
+    cache.set('a', large)
+    cache.set('b', large)
+    assert cache.get('a') == large
+    assert cache.get('b') == large
+    assert len(cache._cache) < 10
+    assert cache._nbytes <= approximate_size(large) * 2
+
+    cache.set('c', large)
+    assert cache.get('a') is None
+    assert cache._nbytes == sum(cache._sizes.values())
+
+    # a value larger than the whole budget is not kept, nor does it evict
+    # the others
+    evictions = cache.stats()['evictions']
+    cache.set('d', large * 3)
+    assert cache.get('d') is None
+    assert cache.get('b') == large
+    assert cache.get('c') == large
+    assert cache.stats()['evictions'] == evictions + 1
+
+    # and replacing a key with one drops the old value
+    cache.set('c', large * 3)
+    assert cache.get('c') is None
+    assert cache.get('b') == large
+
+
+def test_evicts_least_recently_used():
+    cache = InMemoryCache(size=2)
+    cache.set('foo', 1)
+    cache.set('bar', 2)
+    cache.get('foo')
+    cache.set('baz', 3)
+    assert cache.get('foo') == 1
+    assert cache.get('bar') is None
+
+
+def test_approximate_size():
+    small = {'name': 'x', 'emails': [{'email': 'x@example.org'}]}
+    large = {'name': 'x', 'emails': [{'email': 'x@example.org'}] * 10}
+    assert approximate_size(large) > approximate_size(small)
+    assert approximate_size(small) > sys.getsizeof(small)
+
+
 def test_trimmed_if_expired():
     cache = InMemoryCache()
     now = arrow.now().timestamp
@@ -47,6 +105,46 @@ def test_trimmed_if_expired():
     assert cache.get('foo') is None
 
 
+def test_expired_keys_removed_on_set():
+    cache = InMemoryCache()
+    with mock.patch('prospyr.cache.arrow') as arrow_:
+        arrow_.utcnow.return_value.timestamp = 1000
+        cache.set('foo', 'expected', max_age=10)
+        cache.set('bar', 'expected', max_age=20)
+        cache.set('forever', 'expected')
+        arrow_.utcnow.return_value.timestamp = 1010
+        cache.set('baz', 'expected')
+        assert set(cache._cache) == {'bar', 'forever', 'baz'}
+
+        # replacing a key forgets its earlier expiry
+        cache.set('bar', 'replaced')
+        arrow_.utcnow.return_value.timestamp = 1020
+        cache.set('baz', 'expected')
+        assert cache.get('bar') == 'replaced'
+    assert cache.stats()['expirations'] == 1
+
+
+def test_inmem_threadsafe():
+    cache = InMemoryCache(size=50)
+    errors = []
+
+    def work(offset):
+        try:
+            for i in range(500):
+                key = str((i + offset) % 100)
+                if cache.get(key) is None:
+                    cache.set(key, i, max_age=i % 3)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=work, args=(n, )) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(cache._cache) <= 50
+
+
 def test_set_noop():
     cache = NoOpCache()
     cache.set('foo', 'expected')
@@ -58,3 +156,278 @@ def test_clear_noop():
     cache.set('foo', 'expected')
     cache.clear('foo')
     assert cache.get('foo') is None
+
+
+def _sqlite_cache(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), 'cache.db')
+    return SqliteCache(path, **kwargs)
+
+
+def test_sqlite_set_and_get():
+    cache = _sqlite_cache()
+    cache.set('foo', {'expected': [1, 2]})
+    assert cache.get('foo') == {'expected': [1, 2]}
+    assert cache.get('bar') is None
+
+
+def test_sqlite_response_roundtrip():
+    resp = Response()
+    resp.status_code = codes.ok
+    resp._content = b'{"id": 1}'
+    resp.headers['Content-Type'] = 'application/json'
+    resp.headers['Set-Cookie'] = 'secret'
+    cache = _sqlite_cache()
+    cache.set(URLObject('https://example.org/people/1/'), resp)
+
+    cached = cache.get('https://example.org/people/1/')
+    assert isinstance(cached, CachedResponse)
+    assert cached.status_code == codes.ok
+    assert cached.json() == {'id': 1}
+    assert cached.headers['content-type'] == 'application/json'
+    assert 'Set-Cookie' not in cached.headers
+
+
+def test_sqlite_clear():
+    cache = _sqlite_cache()
+    cache.set('foo', 'expected')
+    cache.clear('foo')
+    assert cache.get('foo') is None
+
+
+def test_sqlite_shared_between_instances():
+    path = os.path.join(tempfile.mkdtemp(), 'cache.db')
+    one, two = SqliteCache(path), SqliteCache(path)
+    one.set('foo', 'expected')
+    assert two.get('foo') == 'expected'
+    two.clear('foo')
+    assert one.get('foo') is None
+
+
+def test_sqlite_trimmed_if_oversize():
+    cache = _sqlite_cache(size=2)
+    cache.set('foo', 1)
+    cache.set('bar', 2)
+    cache.set('baz', 3)
+    assert cache.get('foo') is None
+    assert cache.get('baz') == 3
+
+    cache = _sqlite_cache(max_bytes=20)
+    cache.set('foo', 'x' * 10)
+    cache.set('bar', 'y' * 10)
+    assert cache.get('foo') is None
+    assert cache.get('bar') == 'y' * 10
+
+
+def test_sqlite_value_over_max_bytes_not_kept():
+    cache = _sqlite_cache(max_bytes=200)
+    cache.set('foo', 'x')
+    cache.set('bar', 'y')
+    cache.set('big', 'z' * 5000)
+    assert cache.get('big') is None
+    assert cache.get('foo') == 'x'
+    assert cache.get('bar') == 'y'
+
+    cache.set('foo', 'z' * 5000)
+    assert cache.get('foo') is None
+    assert cache.get('bar') == 'y'
+    assert cache.stats()['evictions'] == 2
+
+
+def test_sqlite_trimmed_if_expired():
+    cache = _sqlite_cache()
+    with mock.patch('prospyr.cache.arrow') as arrow_:
+        arrow_.utcnow.return_value.timestamp = 1000
+        cache.set('foo', 'expected', max_age=10)
+        cache.set('forever', 'expected')
+        arrow_.utcnow.return_value.timestamp = 1009
+        assert cache.get('foo') == 'expected'
+        arrow_.utcnow.return_value.timestamp = 1010
+        assert cache.get('foo') is None
+        assert cache.get('forever') == 'expected'
+
+
+def test_sqlite_totals_kept():
+    cache = _sqlite_cache(size=3)
+
+    def totals():
+        db = cache._db()
+        kept = db.execute('SELECT entries, nbytes FROM cache_totals')
+        actual = db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM cache')
+        return kept.fetchone(), actual.fetchone()
+
+    with mock.patch('prospyr.cache.arrow') as arrow_:
+        arrow_.utcnow.return_value.timestamp = 1000
+        cache.set('foo', 'x', max_age=10)
+        cache.set('bar', 'y' * 10)
+        cache.set('bar', 'y' * 20)
+        kept, actual = totals()
+        assert kept == actual
+        assert kept[0] == 2
+
+        cache.clear('bar')
+        cache.set('baz', 'z')
+        cache.set('qux', 'z')
+        cache.set('quux', 'z')
+        arrow_.utcnow.return_value.timestamp = 1010
+        cache.set('corge', 'z')
+    kept, actual = totals()
+    assert kept == actual
+    assert kept[0] == 3
+    assert cache.stats()['entries'] == 3
+
+    # a second instance on the same database shares the totals
+    assert SqliteCache(cache._path).stats()['bytes'] == kept[1]
+
+
+def test_touched_keys_evicted_last():
+    with mock.patch('prospyr.cache.arrow') as arrow_:
+        for cache in (InMemoryCache(size=2), _sqlite_cache(size=2)):
+            arrow_.utcnow.return_value.timestamp = 1000
+            cache.set('foo', 1)
+            arrow_.utcnow.return_value.timestamp = 1001
+            cache.set('bar', 2)
+            arrow_.utcnow.return_value.timestamp = 1002
+            cache.touch('foo')
+            arrow_.utcnow.return_value.timestamp = 1003
+            cache.set('baz', 3)
+            assert cache.get('foo') == 1
+            assert cache.get('bar') is None
+            assert cache.stats()['hits'] == 1
+
+
+def test_sqlite_get_many():
+    cache = _sqlite_cache()
+    cache.set_many({'foo': 1, 'bar': 2})
+    assert cache.get_many(['foo', 'bar', 'baz']) == {'foo': 1, 'bar': 2}
+    assert cache.get_many([]) == {}
+
+
+def test_inmem_get_many():
+    cache = InMemoryCache()
+    cache.set_many({'foo': 1, 'bar': 2})
+    assert cache.get_many(['foo', 'bar', 'baz']) == {'foo': 1, 'bar': 2}
+    assert NoOpCache().get_many(['foo']) == {}
+
+
+class FakeRedis(object):
+    """
+    Just enough of redis.StrictRedis for RedisCache. Expiry is ignored.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append('get')
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.calls.append('mget')
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, px=None):
+        self.calls.append('set')
+        self.data[key] = value
+
+    def delete(self, key):
+        self.calls.append('delete')
+        self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    def set(self, key, value, px=None):
+        self.queued.append((key, value))
+
+    def execute(self):
+        self.client.calls.append('execute')
+        self.client.data.update(self.queued)
+
+
+def test_redis_set_and_get():
+    client = FakeRedis()
+    cache = RedisCache(client)
+    cache.set('foo', {'expected': True}, max_age=10)
+    assert cache.get('foo') == {'expected': True}
+    assert cache.meta('foo').max_age == 10
+    assert set(client.data) == {'prospyr:foo'}
+    cache.clear('foo')
+    assert cache.get('foo') is None
+
+
+def test_redis_bulk_operations_are_batched():
+    client = FakeRedis()
+    cache = RedisCache(client)
+    cache.set_many({'foo': 1, 'bar': 2})
+    assert cache.get_many(['foo', 'bar', 'baz']) == {'foo': 1, 'bar': 2}
+    assert client.calls == ['execute', 'mget']
+
+
+def test_sqlite_non_json_response_roundtrip():
+    resp = Response()
+    resp.status_code = codes.not_found
+    resp._content = b'Not Found'
+    cache = _sqlite_cache()
+    cache.set('foo', resp)
+    cached = cache.get('foo')
+    assert cached.status_code == codes.not_found
+    assert cached.text == 'Not Found'
+
+
+def test_inmem_stats():
+    base = 'https://api.prosperworks.com/developer_api/v1/'
+    cache = InMemoryCache(size=2)
+    cache.set(base + 'people/1/', 'one')
+    cache.get(base + 'people/1/')
+    cache.get(base + 'people/2/')
+    cache.get(base + 'users/')
+    cache.set(base + 'people/2/', 'two')
+    cache.set(base + 'people/3/', 'three')
+    with mock.patch('prospyr.cache.arrow') as arrow_:
+        arrow_.utcnow.return_value.timestamp = 0
+        cache.set(base + 'users/', 'users', max_age=10)
+        arrow_.utcnow.return_value.timestamp = 20
+        cache.get(base + 'users/')
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 3
+    assert stats['hit_ratio'] == 0.25
+    assert stats['expirations'] == 1
+    assert stats['evictions'] == 2
+    assert stats['entries'] == 1
+    assert stats['bytes'] == approximate_size('three')
+    assert stats['patterns'] == {
+        'people/{id}/': {'hits': 1, 'misses': 1, 'hit_ratio': 0.5},
+        'users/': {'hits': 0, 'misses': 2, 'hit_ratio': 0},
+    }
+
+
+def test_other_stats():
+    assert NoOpCache().stats()['hit_ratio'] is None
+    cache = NoOpCache()
+    cache.get('foo')
+    assert cache.stats()['misses'] == 1
+
+    cache = _sqlite_cache(size=1)
+    cache.set('foo', 1)
+    cache.set('bar', 2)
+    cache.get_many(['foo', 'bar'])
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+    assert (stats['entries'], stats['evictions']) == (1, 1)
+
+    cache = RedisCache(FakeRedis())
+    cache.set('foo', 1)
+    cache.get('foo')
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['entries'] is None
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import mock
+from nose.tools import assert_raises
+from requests import Response, codes
+
+from prospyr.codec import JSONCodec, get_codec
+from prospyr.connection import Connection
+from prospyr.exceptions import MisconfiguredError
+
+
+class CountingCodec(JSONCodec):
+
+    def __init__(self):
+        self.loaded = []
+        self.dumped = []
+
+    def loads(self, data):
+        self.loaded.append(data)
+        return super(CountingCodec, self).loads(data)
+
+    def dumps(self, value):
+        self.dumped.append(value)
+        return super(CountingCodec, self).dumps(value)
+
+
+def test_get_codec():
+    assert isinstance(get_codec(), JSONCodec)
+    assert get_codec('json').loads(b'{"a": [1]}') == {'a': [1]}
+    codec = CountingCodec()
+    assert get_codec(codec) is codec
+
+    with assert_raises(MisconfiguredError):
+        get_codec('pickle')
+    with mock.patch.dict('sys.modules', {'orjson': None}):
+        with assert_raises(MisconfiguredError):
+            get_codec('orjson')
+
+
+def test_connection_uses_codec():
+    codec = CountingCodec()
+    cn = Connection(url='url', email='email', token='token', codec=codec)
+    resp = Response()
+    resp._content = '{"name": "Zoë"}'.encode('utf-8')
+    resp.status_code = codes.ok
+    cn.session = mock.Mock(**{'get.return_value': resp,
+                              'post.return_value': resp})
+
+    assert cn.get('url').json() == {'name': 'Zoë'}
+    assert codec.loaded == [resp._content]
+
+    cn.post('url', json={'name': 'Zoë'})
+    cn.session.post.assert_called_once_with(
+        'url', data='{"name":"Zoë"}'.encode('utf-8'))
+    assert cn.decode(cn.post('url')) == {'name': 'Zoë'}
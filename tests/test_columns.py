@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import mock
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_raises
+
+import prospyr
+from prospyr.connection import connect
+from prospyr.exceptions import MisconfiguredError
+from prospyr.search import ResultSet
+from prospyr.testing import generate
+from tests import json_to_resp, reset_conns
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _opportunities():
+    rows = generate.rows('opportunity', 5)
+    rows[3].update(monetary_value=None, close_date=None, stage=None,
+                   priority='Urgent')
+    cn = connect(email='foo', token='bar')
+    cn.session.post = mock.Mock(side_effect=[
+        json_to_resp(rows[:3]), json_to_resp(rows[3:]),
+    ])
+    return rows, ResultSet(resource_cls=prospyr.Opportunity, page_size=3)
+
+
+@reset_conns
+def test_to_columns():
+    if np is None:
+        raise SkipTest('numpy is not installed')
+    rows, results = _opportunities()
+    with mock.patch.object(prospyr.Opportunity, 'from_api_data') as build:
+        columns = results.to_columns()
+    assert not build.called
+
+    assert list(columns)[0] == 'id'
+    assert 'tags' not in columns
+    assert columns['id'].dtype == np.int64
+    assert list(columns['id']) == [1, 2, 3, 4, 5]
+    assert columns['pipeline_stage_id'].dtype == np.int64
+    # missing values
+    assert columns['monetary_value'].dtype == np.float64
+    assert np.isnan(columns['monetary_value'][3])
+    assert columns['close_date'].dtype == np.dtype('datetime64[s]')
+    assert np.isnat(columns['close_date'][3])
+    assert columns['close_date'][0] == np.datetime64(rows[0]['close_date'],
+                                                     's')
+
+    stage = columns['stage']
+    assert stage.codes.dtype == np.int8
+    assert stage.categories == ['Open', 'Won', 'Lost', 'Abandoned']
+    assert list(stage.values()) == [row['stage'] for row in rows]
+    # values the schema does not allow are kept
+    assert columns['priority'].values()[3] == 'Urgent'
+
+
+@reset_conns
+def test_chosen_columns():
+    if np is None:
+        raise SkipTest('numpy is not installed')
+    rows, results = _opportunities()
+    columns = results.to_columns(columns=['tags', 'id'])
+    assert list(columns) == ['tags', 'id']
+    assert list(columns['tags']) == [row['tags'] for row in rows]
+    with assert_raises(ValueError):
+        results.to_columns(columns=['nope'])
+
+
+@reset_conns
+def test_to_dataframe():
+    try:
+        import pandas as pd
+    except ImportError:
+        raise SkipTest('pandas is not installed')
+    rows, results = _opportunities()
+    frame = results.to_dataframe()
+    assert len(frame) == 5
+    assert frame['stage'].dtype.name == 'category'
+    assert pd.isnull(frame['stage'][3])
+    assert frame['close_date'].dtype.kind == 'M'
+    assert frame['win_probability'].sum() == sum(r['win_probability']
+                                                 for r in rows)
+
+
+def test_missing_numpy():
+    with mock.patch.dict('sys.modules', {'numpy': None}):
+        with assert_raises(MisconfiguredError):
+            ResultSet(resource_cls=prospyr.Opportunity).to_columns()
@@ -2,12 +2,19 @@
 
 from __future__ import absolute_import, print_function, unicode_literals
 
+import threading
+import time
+
 import mock
 from nose.tools import assert_raises
+from requests import PreparedRequest, Response, Timeout, codes
+from requests.adapters import HTTPAdapter
 
+from prospyr.cache import CachedResponse
 from prospyr.connection import Connection, connect, get, url_join, validate_url
-from prospyr.exceptions import MisconfiguredError
-from tests import reset_conns
+from prospyr.deadline import Deadline
+from prospyr.exceptions import DeadlineExceeded, MisconfiguredError
+from tests import json_to_resp, reset_conns
 
 
 @reset_conns
@@ -75,6 +82,8 @@ def test_url_join():
 def test_http_verbs():
     cn = Connection(url='url', email='email', token='token')
     mock_session = mock.Mock()
+    # GET responses are decoded for the cache
+    mock_session.get.return_value.content = b'{}'
     cn.session = mock_session
     verbs = 'put', 'post', 'patch', 'options', 'delete', 'get'
     for verb in verbs:
@@ -90,3 +99,157 @@ def test_build_absolute_url():
     cn.api_url = 'https://hostname.tld/foo/'
     expected = cn.build_absolute_url('bar/baz')
     assert expected == 'https://hostname.tld/foo/bar/baz'
+
+
+def test_get_many():
+    cn = Connection(url='url', email='email', token='token')
+    cn.session = mock.Mock()
+    cn.session.get.side_effect = json_to_resp
+    cn.get('cached')
+    responses = cn.get_many(['one', 'cached', 'two', 'one'])
+    assert [r.json() for r in responses] == ['one', 'cached', 'two', 'one']
+    assert cn.session.get.call_count == 3
+    assert cn.get('two').json() == 'two'
+    assert cn.session.get.call_count == 3
+
+
+def test_get_caches_decoded_response():
+    cn = Connection(url='url', email='email', token='token')
+    cn.session = mock.Mock()
+    resp = json_to_resp({'id': 1})
+    resp.headers['Content-Type'] = 'application/json'
+    resp.headers['Set-Cookie'] = 'not kept'
+    cn.session.get.return_value = resp
+
+    first, second = cn.get('url'), cn.get('url')
+    assert isinstance(first, CachedResponse)
+    assert first is second
+    assert first.json() == {'id': 1}
+    assert first.json() is second.json()  # decoded just once
+    assert first.ok
+    assert dict(first.headers) == {'Content-Type': 'application/json'}
+
+
+def test_get_caches_non_json_response():
+    cn = Connection(url='url', email='email', token='token')
+    cn.session = mock.Mock()
+    resp = Response()
+    resp._content = b'Not Found'
+    resp.status_code = codes.not_found
+    cn.session.get.return_value = resp
+
+    cached = cn.get('url')
+    assert not cached.ok
+    assert cached.text == 'Not Found'
+    with assert_raises(ValueError):
+        cached.json()
+
+
+def test_not_found_cached_briefly():
+    cn = Connection(url='url', email='email', token='token',
+                    not_found_max_age=1)
+    cn.session = mock.Mock()
+    not_found = Response()
+    not_found._content = b''
+    not_found.status_code = codes.not_found
+    cn.session.get.return_value = not_found
+    cn.get('url')
+    assert cn.get('url').status_code == codes.not_found
+    assert cn.session.get.call_count == 1
+    assert cn.cache.meta('url').max_age == 1
+
+    cn.invalidate('url')
+    cn.get('url')
+    assert cn.session.get.call_count == 2
+
+    # other errors are not cached at all
+    server_error = Response()
+    server_error._content = b''
+    server_error.status_code = codes.server_error
+    cn.session.get.return_value = server_error
+    cn.get('other')
+    cn.get_many(['other'])
+    assert cn.session.get.call_count == 4
+
+
+def test_session_strategies():
+    cn = Connection(url='url', email='email', token='token', pool_maxsize=3)
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(cn.session))
+    thread.start()
+    thread.join()
+    assert sessions == [cn.session]
+    adapter = cn.session.get_adapter('https://api.prosperworks.com/')
+    assert adapter._pool_maxsize == 3
+
+    cn = Connection(url='url', email='email', token='token',
+                    session_strategy='thread', keep_alive=False)
+    thread = threading.Thread(target=lambda: sessions.append(cn.session))
+    thread.start()
+    thread.join()
+    assert sessions[-1] is not cn.session
+    assert cn.session is cn.session
+    assert cn.session.headers['Connection'] == 'close'
+
+    # an assigned session is used by all threads
+    cn.session = mock_session = mock.Mock()
+    thread = threading.Thread(target=lambda: sessions.append(cn.session))
+    thread.start()
+    thread.join()
+    assert sessions[-1] is mock_session
+
+    with assert_raises(MisconfiguredError):
+        Connection(url='url', email='email', token='token',
+                   session_strategy='unknown')
+
+
+def test_default_timeouts():
+    cn = Connection(url='url', email='email', token='token',
+                    connect_timeout=2, read_timeout=5)
+    adapter = cn.session.get_adapter('https://api.prosperworks.com/')
+    assert adapter.timeout == (2, 5)
+
+    request = PreparedRequest()
+    with mock.patch.object(HTTPAdapter, 'send') as send:
+        adapter.send(request, timeout=None)
+        assert send.call_args[1]['timeout'] == (2, 5)
+        adapter.send(request, timeout=1)
+        assert send.call_args[1]['timeout'] == 1
+
+
+def test_deadline_clamps_timeout():
+    cn = Connection(url='url', email='email', token='token')
+    cn.session = mock.Mock()
+    cn.post('url', json={}, deadline=1)
+    connect_timeout, read_timeout = cn.session.post.call_args[1]['timeout']
+    assert 0 < connect_timeout <= 1
+    assert 0 < read_timeout <= 1
+
+    with assert_raises(DeadlineExceeded):
+        cn.post('url', deadline=Deadline(0))
+    assert cn.session.post.call_count == 1
+
+    # timeouts caused by the deadline become DeadlineExceeded
+    def slow(*args, **kwargs):
+        time.sleep(0.02)
+        raise Timeout()
+    cn.session.post.side_effect = slow
+    with assert_raises(DeadlineExceeded):
+        cn.post('url', deadline=0.01)
+    with assert_raises(Timeout):
+        cn.post('url', deadline=10)
+
+
+def test_get_many_stops_at_deadline():
+    cn = Connection(url='url', email='email', token='token')
+    cn.session = mock.Mock()
+
+    def slow_json_resp(url, *args, **kwargs):
+        time.sleep(0.02)
+        return json_to_resp(url)
+    cn.session.get.side_effect = slow_json_resp
+    cn.get('cached')
+
+    responses = cn.get_many(['one', 'two', 'cached'], deadline=0.01)
+    assert [r and r.json() for r in responses] == ['one', None, 'cached']
+    assert cn.session.get.call_count == 2
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from nose.tools import assert_raises
+
+import prospyr
+from prospyr.exceptions import ApiError
+from prospyr.testing.fake import FakeProsperWorks
+from tests import reset_conns
+
+
+def _connect(fake):
+    return prospyr.connect(email='foo', token='bar', url=fake.url)
+
+
+def test_search_pages():
+    fake = FakeProsperWorks(counts={'person': 45}, max_page_size=20)
+
+    status, page, _ = fake.respond('POST', '/developer_api/v1/people/search/',
+                                   {'page_size': 200, 'page_number': 3})
+    assert status == 200
+    assert [row['id'] for row in page] == [41, 42, 43, 44, 45]
+
+    status, page, _ = fake.respond(
+        'POST', '/developer_api/v1/people/search/',
+        {'page_size': 5, 'sort_by': 'id', 'sort_direction': 'desc'}
+    )
+    assert [row['id'] for row in page] == [45, 44, 43, 42, 41]
+
+
+def test_respond_routes():
+    fake = FakeProsperWorks(counts={'person': 3})
+
+    status, _, _ = fake.respond('GET', '/developer_api/v1/people/4/')
+    assert status == 404
+    status, created, _ = fake.respond('POST', '/developer_api/v1/people/',
+                                      {'name': 'Ada Lovelace'})
+    assert (status, created['id']) == (200, 4)
+    status, updated, _ = fake.respond('PUT', '/developer_api/v1/people/4/',
+                                      {'title': 'Countess'})
+    assert (updated['name'], updated['title']) == ('Ada Lovelace', 'Countess')
+    status, deleted, _ = fake.respond('DELETE', '/developer_api/v1/people/4/')
+    assert deleted == {'id': 4, 'is_deleted': True}
+    assert 4 not in fake.records('person')
+
+
+@reset_conns
+def test_serves_prospyr():
+    with FakeProsperWorks(counts={'person': 30, 'company': 5}) as fake:
+        _connect(fake)
+        people = list(prospyr.Person.objects.all())
+        assert len(people) == 30
+        assert prospyr.Person.objects.get(id=7).id == 7
+        assert people[0].company.id in fake.records('company')
+
+        email = fake.records('person')[3]['emails'][0]['email']
+        assert prospyr.Person.objects.get(email=email).id == 3
+
+        person = prospyr.Person(name='Grace Hopper')
+        person.create()
+        assert person.id == 31
+        person.delete()
+        with assert_raises(ApiError):
+            prospyr.Person.objects.get(id=31)
+
+
+@reset_conns
+def test_injected_failures():
+    with FakeProsperWorks(counts={'person': 1}) as fake:
+        _connect(fake)
+        fake.fail_next(429)
+        fake.fail_next(503)
+        for status in ('429', '503'):
+            with assert_raises(ApiError) as raised:
+                prospyr.Person.objects.get(id=1)
+            assert status in str(raised.exception)
+        assert prospyr.Person.objects.get(id=1).id == 1
+        assert len(fake.requests) == 3
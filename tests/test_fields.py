@@ -77,6 +77,7 @@ def test_load_single_nested_resource():
     assert loaded['stage_idonly'].name == 'Third Stage'
 
 
+@reset_conns
 def test_load_multiple_nested_resource():
     schema = MultipleParent()
     stage_3_and_4 = [
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import itertools
+import json
+import types
+
+from requests import codes
+
+import prospyr
+from prospyr.testing import generate
+from tests import load_fixture_json, make_cn_with_resp, reset_conns
+
+resources = {
+    'person': prospyr.Person,
+    'company': prospyr.Company,
+    'opportunity': prospyr.Opportunity,
+    'activity': prospyr.Activity,
+    'task': prospyr.Task,
+    'lead': prospyr.Lead,
+}
+
+
+@reset_conns
+def test_rows_match_schemas():
+    # activity types are read through the default connection
+    make_cn_with_resp('get', codes.ok,
+                      json.loads(load_fixture_json('activity_types.json')),
+                      name='default')
+    for kind, resource_cls in resources.items():
+        for row in generate.rows(kind, 20):
+            result = resource_cls.Meta.schema.load(row)
+            assert not result.errors, (kind, result.errors)
+
+
+def test_seeded():
+    assert generate.rows('person', 5) == generate.rows('person', 5)
+    assert generate.rows('person', 5) != generate.rows('person', 5, seed=1)
+
+
+def test_streams():
+    rows = generate.iter_rows('opportunity', 10 ** 9)
+    assert isinstance(rows, types.GeneratorType)
+    ids = [row['id'] for row in itertools.islice(rows, 3)]
+    assert ids == [1, 2, 3]
+
+
+def test_refs():
+    rows = generate.rows('opportunity', 500, refs={'user': 3, 'person': 2})
+    assert {row['assignee_id'] for row in rows} == {1, 2, 3}
+    assert {row['primary_contact_id'] for row in rows} == {1, 2}
+    assert {row['company_id'] for row in rows} == {None}
+
+    rows = generate.rows('activity', 50, refs={'company': 4},
+                         identifier_types=('company',))
+    assert {row['parent']['type'] for row in rows} == {'company'}
+    assert {row['parent']['id'] for row in rows} <= {1, 2, 3, 4}
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import gc
+import threading
+
+import mock
+from marshmallow import fields
+
+from prospyr import mixins
+from prospyr.connection import connect
+from prospyr.identity import IdentityMap, active, unit_of_work
+from prospyr.resources import Resource
+from prospyr.search import ResultSet
+from tests import json_to_resp, reset_conns
+
+
+class DatedResource(Resource, mixins.Readable):
+    class Meta:
+        search_path = 'dated/search/'
+        detail_path = 'dated/{id}/'
+
+    id = fields.Integer()
+    name = fields.String()
+    date_modified = fields.Integer()
+
+
+def test_load_returns_held_instance():
+    identity_map = IdentityMap()
+    first = identity_map.load(DatedResource, {'id': 1, 'name': 'first',
+                                              'date_modified': 10})
+    same = identity_map.load(DatedResource, {'id': 1, 'name': 'stale',
+                                             'date_modified': 5})
+    assert same is first
+    assert first.name == 'first'
+
+    newer = identity_map.load(DatedResource, {'id': 1, 'name': 'newer',
+                                              'date_modified': 20})
+    assert newer is first
+    assert first.name == 'newer'
+
+    other = identity_map.load(DatedResource, {'id': 2, 'name': 'other'})
+    assert other is not first
+    assert len(identity_map) == 2
+
+
+def test_unchanged_records_not_deserialised_again():
+    identity_map = IdentityMap()
+    data = {'id': 1, 'name': 'first', 'date_modified': 10}
+    first = identity_map.load(DatedResource, data)
+    with mock.patch.object(DatedResource, '_load_raw') as load_raw:
+        assert identity_map.load(DatedResource, data) is first
+    assert not load_raw.called
+
+
+@reset_conns
+def test_search_results_share_instances():
+    cn = connect(email='foo', token='bar', identity_map=True)
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1, 'name': 'first', 'date_modified': 10}]
+    ))
+    first, = ResultSet(resource_cls=DatedResource)
+    second, = ResultSet(resource_cls=DatedResource)
+    assert first is second
+
+    # detail reads still read the record, refreshing the held instance
+    cn.session.get = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        {'id': 1, 'name': 'newer', 'date_modified': 20}
+    ))
+    assert DatedResource.objects.get(id=1) is first
+    assert cn.session.get.called
+    assert first.name == 'newer'
+
+
+@reset_conns
+def test_get_loads_through_identity_map():
+    cn = connect(email='foo', token='bar', identity_map=True)
+    cn.session.get = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        {'id': 1, 'name': 'first', 'date_modified': 10}
+    ))
+    with mock.patch.object(DatedResource, '_load_raw',
+                           wraps=DatedResource._load_raw) as load_raw:
+        first = DatedResource.objects.get(id=1)
+        assert DatedResource.objects.get(id=1) is first
+        assert DatedResource.objects.get(id=1) is first
+    assert load_raw.call_count == 1
+    assert first.name == 'first'
+
+
+def test_unused_instances_forgotten():
+    identity_map = IdentityMap()
+    kept = identity_map.load(DatedResource, {'id': 1, 'name': 'kept'})
+    identity_map.load(DatedResource, {'id': 2, 'name': 'dropped'})
+    gc.collect()
+    assert len(identity_map) == 1
+    assert identity_map.get(DatedResource, 1) is kept
+    assert identity_map.get(DatedResource, 2) is None
+
+
+@reset_conns
+def test_unit_of_work():
+    cn = connect(email='foo', token='bar')
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1, 'name': 'first', 'date_modified': 10}]
+    ))
+    with unit_of_work() as identity_map:
+        assert active() is identity_map
+        first, = ResultSet(resource_cls=DatedResource)
+        second, = ResultSet(resource_cls=DatedResource)
+        assert first is second
+    assert active() is None
+    assert cn.identity_map is None
+
+    first, = ResultSet(resource_cls=DatedResource)
+    second, = ResultSet(resource_cls=DatedResource)
+    assert first is not second
+
+
+@reset_conns
+def test_unit_of_work_per_thread():
+    cn = connect(email='foo', token='bar')
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1, 'name': 'first', 'date_modified': 10}]
+    ))
+    entered = {'a': threading.Event(), 'b': threading.Event()}
+    found = {}
+
+    def work(name, other):
+        with unit_of_work() as identity_map:
+            # both blocks are open before either queries
+            entered[name].set()
+            entered[other].wait(1)
+            found[name] = (identity_map, active(),
+                           list(ResultSet(resource_cls=DatedResource)),
+                           list(ResultSet(resource_cls=DatedResource)))
+
+    threads = [threading.Thread(target=work, args=('a', 'b')),
+               threading.Thread(target=work, args=('b', 'a'))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(found) == {'a', 'b'}
+    for identity_map, current, (first, ), (second, ) in found.values():
+        assert current is identity_map
+        assert first is second
+    assert found['a'][2][0] is not found['b'][2][0]
+    assert found['a'][0] is not found['b'][0]
+    assert active() is None
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import mock
+from nose.tools import assert_raises
+from requests import ConnectionError, PreparedRequest, codes
+
+from prospyr.connection import Connection
+from prospyr.instrument import Instrument, LatencyHistogram, RequestEvent
+from tests import json_to_resp
+
+url = 'https://api.prosperworks.com/developer_api/v1/people/1/'
+
+
+class Recorder(Instrument):
+
+    def __init__(self):
+        self.before = []
+        self.after = []
+
+    def before_request(self, event):
+        self.before.append(event)
+
+    def after_request(self, event):
+        self.after.append(event)
+
+
+def json_resp(url, data=None):
+    request = PreparedRequest()
+    request.prepare(method='GET', url=url, data=data)
+    resp = json_to_resp({'id': 1})
+    resp.request = request
+    return resp
+
+
+def test_requests_reported():
+    recorder = Recorder()
+    cn = Connection(url='url', email='email', token='token',
+                    instruments=[recorder])
+    cn.session = mock.Mock()
+    cn.session.get.side_effect = json_resp
+    cn.session.post.side_effect = json_resp
+
+    cn.get(url)
+    cn.get(url)
+    cn.post(url, json={'name': 'Steve'})
+    assert len(recorder.before) == 2
+    assert len(recorder.after) == 3
+
+    fetched, cached, posted = recorder.after
+    assert fetched is recorder.before[0]
+    assert fetched.endpoint == 'GET people/{id}/'
+    assert fetched.status == codes.ok
+    assert fetched.latency >= 0
+    assert fetched.response_bytes == len(b'{"id": 1}')
+    assert not fetched.from_cache
+    assert cached.from_cache
+    assert cached.response_bytes == 0
+    assert posted.request_bytes == len(b'{"name":"Steve"}')
+
+    cn.session.put.side_effect = ConnectionError()
+    with assert_raises(ConnectionError):
+        cn.put(url)
+    assert isinstance(recorder.after[-1].error, ConnectionError)
+    assert recorder.after[-1].status is None
+
+
+def test_broken_instrument_ignored():
+    broken = mock.Mock(**{'after_request.side_effect': Exception()})
+    cn = Connection(url='url', email='email', token='token',
+                    instruments=[broken])
+    cn.session = mock.Mock()
+    cn.session.get.side_effect = json_resp
+    assert cn.get(url).json() == {'id': 1}
+    assert broken.before_request.called
+
+
+def event(latency, from_cache=False, error=None):
+    event = RequestEvent('get', url, from_cache=from_cache)
+    event.latency = latency
+    event.error = error
+    event.response_bytes = 10
+    return event
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(buckets=(0.1, 1))
+    for latency in (0.05, 0.05, 0.5, 5):
+        histogram.after_request(event(latency))
+    histogram.after_request(event(0, from_cache=True))
+    histogram.after_request(event(0.5, error=Exception()))
+
+    stats = histogram.as_dict()['GET people/{id}/']
+    assert stats['count'] == 5
+    assert stats['cache_hits'] == 1
+    assert stats['errors'] == 1
+    assert stats['bytes_received'] == 50
+    assert stats['buckets'] == [[0.1, 2], [1, 2], [None, 1]]
+    assert stats['p50'] == 1
+    assert stats['p99'] is None
+    assert histogram.quantile('GET people/{id}/', 0.2) == 0.1
+    assert histogram.quantile('GET unknown/', 0.5) is None
+
+    histogram.clear()
+    assert histogram.as_dict() == {}
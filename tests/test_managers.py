@@ -1,6 +1,22 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+import time
+
+import mock
+from marshmallow import fields
 from nose.tools import assert_raises
+from requests import codes
 
-from prospyr.resources import NoCollectionManager
+from prospyr import mixins
+from prospyr.cache import NoOpCache
+from prospyr.connection import connect
+from prospyr.exceptions import ApiError
+from prospyr.resources import (ListOnlyManager, NoCollectionManager, Resource,
+                               SecondaryResource)
+from tests import json_to_resp, reset_conns
 
 
 class FakeResource(object):
@@ -18,3 +34,167 @@ def test_not_a_collection_manager():
 
     with assert_raises(NotImplementedError):
         mgr.filter(foo='bar')
+
+
+class ListedResource(SecondaryResource):
+    class Meta:
+        list_path = 'listed/'
+    id = fields.Integer()
+    name = fields.String()
+
+
+class OtherListedResource(SecondaryResource):
+    class Meta:
+        list_path = 'other_listed/'
+    id = fields.Integer()
+    name = fields.String()
+
+
+def mock_list_get(cn, names_by_path):
+    def get(url, *args, **kwargs):
+        names = names_by_path[url.split('/v1/')[1]]
+        return json_to_resp([{'id': id, 'name': name}
+                             for id, name in enumerate(names)])
+    cn.session.get = mock.Mock(side_effect=get)
+
+
+@reset_conns
+def test_list_results_kept_per_connection_and_resource():
+    cn_a = connect(email='foo', token='bar', name='a')
+    cn_b = connect(email='foo', token='bar', name='b')
+    mock_list_get(cn_a, {'listed/': ['a0'], 'other_listed/': ['other0']})
+    mock_list_get(cn_b, {'listed/': ['b0']})
+
+    assert ListedResource.objects.use('a').get(id=0).name == 'a0'
+    assert ListedResource.objects.use('b').get(id=0).name == 'b0'
+    assert OtherListedResource.objects.use('a').get(id=0).name == 'other0'
+    assert ListedResource.objects.use('a').get(id=0).name == 'a0'
+    assert cn_a.session.get.call_count == 2
+    assert cn_b.session.get.call_count == 1
+
+
+@reset_conns
+def test_list_results_expire():
+    cn = connect(email='foo', token='bar', cache=NoOpCache())
+    mock_list_get(cn, {'listed/': ['zero']})
+    with mock.patch('prospyr.resources.time') as time:
+        time.time.return_value = 1000
+        ListedResource.objects.get(id=0)
+        time.time.return_value = 1000 + ListOnlyManager.results_max_age - 1
+        ListedResource.objects.get(id=0)
+        assert cn.session.get.call_count == 1
+        time.time.return_value = 1000 + ListOnlyManager.results_max_age
+        ListedResource.objects.get(id=0)
+        assert cn.session.get.call_count == 2
+
+
+@reset_conns
+def test_unknown_id_refreshes_are_rate_limited():
+    cn = connect(email='foo', token='bar')
+    mock_list_get(cn, {'listed/': ['zero']})
+    with mock.patch('prospyr.resources.time') as time:
+        time.time.return_value = 1000
+        ListedResource.objects.get(id=0)
+        for _ in range(3):
+            with assert_raises(KeyError):
+                ListedResource.objects.get(id=1)
+        # one refresh, which bypassed the URL cache
+        assert cn.session.get.call_count == 2
+
+        # a record created since is found after the interval
+        mock_list_get(cn, {'listed/': ['zero', 'one']})
+        time.time.return_value = 1000 + ListOnlyManager.unknown_id_interval
+        assert ListedResource.objects.get(id=1).name == 'one'
+
+
+@reset_conns
+def test_one_refresh_at_a_time():
+    cn = connect(email='foo', token='bar', cache=NoOpCache())
+    mock_list_get(cn, {'listed/': ['zero']})
+    slow_get = cn.session.get.side_effect
+
+    def get(*args, **kwargs):
+        time.sleep(0.05)
+        return slow_get(*args, **kwargs)
+    cn.session.get.side_effect = get
+
+    threads = [threading.Thread(target=ListedResource.objects.get, args=(0, ))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cn.session.get.call_count == 1
+
+
+def test_bound_managers_are_not_shared():
+    on_a = ListedResource.objects.use('a')
+    on_b = ListedResource.objects.use('b')
+    other = OtherListedResource.objects
+    assert (on_a.using, on_b.using) == ('a', 'b')
+    assert ListedResource.objects.using == 'default'
+    assert on_a.resource_cls is ListedResource
+    assert other.resource_cls is OtherListedResource
+    assert on_a.use('a') is on_a
+
+
+@reset_conns
+def test_managers_used_from_threads():
+    names = ['a%s' % n for n in range(10)]
+    for name in names:
+        cn = connect(email='foo', token='bar', name=name, cache=NoOpCache())
+        mock_list_get(cn, {'listed/': [name], 'other_listed/': [name]})
+
+    found = []
+
+    def get(name, resource_cls):
+        for _ in range(20):
+            result = resource_cls.objects.use(name).get(id=0)
+            found.append((name, result.name, type(result)))
+    threads = [threading.Thread(target=get, args=(name, resource_cls))
+               for name in names
+               for resource_cls in (ListedResource, OtherListedResource)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(found) == 400
+    assert all(name == result_name for name, result_name, _ in found)
+    assert {cls for _, _, cls in found} == {ListedResource,
+                                            OtherListedResource}
+
+
+class DetailedResource(Resource, mixins.Readable):
+    class Meta:
+        detail_path = 'detailed/{id}/'
+    id = fields.Integer()
+
+
+@reset_conns
+def test_get_many():
+    cn = connect(email='foo', token='bar', identity_map=True)
+
+    def get(url, *args, **kwargs):
+        id = int(url.rstrip('/').split('/')[-1])
+        if id == 404:
+            return json_to_resp(None, status_code=codes.not_found)
+        time.sleep(0.02)
+        return json_to_resp({'id': id})
+    cn.session.get = mock.Mock(side_effect=get)
+
+    one = DetailedResource.objects.get(1)
+    found = DetailedResource.objects.get_many([1, 2, 3], deadline=0.01)
+    assert found[1] is one
+    assert set(found) == {1, 2}
+    assert found[2].id == 2
+    assert cn.session.get.call_count == 2
+
+    found = DetailedResource.objects.get_many([2, 3])
+    assert set(found) == {2, 3}
+
+    found = DetailedResource.objects.get_many(id for id in (1, 4))
+    assert set(found) == {1, 4}
+
+    with assert_raises(ApiError):
+        DetailedResource.objects.get_many([404])
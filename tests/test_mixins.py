@@ -8,6 +8,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 import json
 
+import mock
 from nose.tools import assert_raises
 from requests import codes
 from urlobject import URLObject
@@ -97,3 +98,13 @@ def test_update():
         assert 'Something wrong' in str(ex)
     else:
         raise AssertionError('Exception not thrown')
+
+
+@reset_conns
+def test_writes_invalidate_search_cache():
+    content = json.loads(load_fixture_json('person.json'))
+    cn = make_cn_with_resp(method='put', status_code=codes.ok, content=content)
+    cn.invalidate_search = mock.Mock()
+    Person(id=1, name='Nantucket Terwilliger').update(using=cn.name)
+    expected_url = URLObject(_default_url + 'v1/people/search/')
+    cn.invalidate_search.assert_called_with(expected_url)
@@ -1,9 +1,12 @@
 import mock
 from marshmallow import fields
 from nose.tools import assert_raises
+from requests import Response, codes
 
+from prospyr.connection import connect
 from prospyr.exceptions import ValidationError
 from prospyr.resources import NestedIdentifiedResource, Resource
+from tests import reset_conns
 
 types = {'child': 'tests.test_nested_identified_resource.Child'}
 
@@ -23,6 +26,12 @@ class Parent(Resource):
     children = NestedIdentifiedResource(types=types, many=True)
 
 
+class PersonParent(Resource):
+    class Meta:
+        pass
+    child = NestedIdentifiedResource(allow_none=True)
+
+
 class Child(Resource):
     class Meta:
         pass
@@ -95,3 +104,17 @@ def test_allow_none():
             {'type': None, 'id': None},
         ]
     }
+
+
+@reset_conns
+def test_missing_parent_fetched_once():
+    cn = connect(email='foo', token='bar')
+    not_found = Response()
+    not_found._content = b'{"message": "Resource not found"}'
+    not_found.status_code = codes.not_found
+    cn.session.get = mock.Mock(return_value=not_found)
+    raw = {'child': {'type': 'person', 'id': 1}}
+
+    for _ in range(3):
+        assert PersonParent.from_api_data(raw).child is None
+    assert cn.session.get.call_count == 1
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import warnings
+
+import mock
+from marshmallow import fields
+from nose.tools import assert_raises
+
+from prospyr.connection import connect
+from prospyr.exceptions import NPlusOneError, NPlusOneWarning
+from prospyr.fields import NestedIdentifiedResource
+from prospyr.resources import ListOnlyManager, Related, Resource, User
+from prospyr.search import ResultSet
+from tests import json_to_resp, reset_conns
+
+
+class Owner(Resource):
+    class Meta:
+        detail_path = 'owners/{id}/'
+    id = fields.Integer()
+
+
+class Pet(Resource):
+    class Meta:
+        search_path = 'pets/search/'
+    id = fields.Integer()
+    owner = Related(Owner)
+    assignee = Related(User)
+
+
+class Tag(Resource):
+    class Meta:
+        search_path = 'tags/search/'
+    id = fields.Integer()
+    owner = NestedIdentifiedResource(types={'person': 'tests.test_nplusone.Owner'})  # noqa
+
+
+def pets_cn(n_plus_one, count):
+    cn = connect(email='foo', token='bar', n_plus_one=n_plus_one,
+                 n_plus_one_threshold=2)
+    rows = [{'id': id, 'owner_id': id, 'assignee_id': 1}
+            for id in range(count)]
+    cn.session.post = mock.Mock(return_value=json_to_resp(rows))
+    return cn
+
+
+@reset_conns
+@mock.patch.object(Owner, 'objects')
+def test_warn(objects):
+    pets_cn('warn', count=4)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        for pet in ResultSet(resource_cls=Pet, page_size=10):
+            pet.owner
+    assert objects.get.call_count == 4
+    assert len(caught) == 1
+    assert caught[0].category is NPlusOneWarning
+    message = str(caught[0].message)
+    assert '3 Owner records' in message
+    assert 'Pet.owner' in message
+    assert 'Owner.objects.get_many(ids)' in message
+
+
+@reset_conns
+@mock.patch.object(Owner, 'objects')
+def test_raise(objects):
+    pets_cn('raise', count=4)
+    pets = ResultSet(resource_cls=Pet, page_size=10)
+    pets[0].owner
+    pets[1].owner
+    with assert_raises(NPlusOneError):
+        pets[2].owner
+
+    # counts are kept per result set
+    for pet in ResultSet(resource_cls=Pet, page_size=10)[:2]:
+        pet.owner
+
+    # instances not from a result set are not counted
+    for id in range(4):
+        Pet(owner_id=id).owner
+
+
+@reset_conns
+@mock.patch.object(ListOnlyManager, 'get')
+def test_list_only_resources_ignored(get):
+    pets_cn('raise', count=4)
+    for pet in ResultSet(resource_cls=Pet, page_size=10):
+        pet.assignee
+
+
+@reset_conns
+@mock.patch.object(Owner, 'objects')
+def test_nested_fetches(objects):
+    cn = connect(email='foo', token='bar', n_plus_one='raise',
+                 n_plus_one_threshold=2)
+    rows = [{'id': id, 'owner': {'type': 'person', 'id': id}}
+            for id in range(3)]
+    cn.session.post = mock.Mock(return_value=json_to_resp(rows))
+    with assert_raises(NPlusOneError):
+        list(ResultSet(resource_cls=Tag, page_size=10))
+
+
+@reset_conns
+def test_disabled_by_default():
+    cn = connect(email='foo', token='bar')
+    assert cn.n_plus_one is None
+    with assert_raises(ValueError):
+        connect(email='foo', token='bar', name='other', n_plus_one='shout')
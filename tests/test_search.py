@@ -2,18 +2,19 @@
 
 from __future__ import absolute_import, print_function, unicode_literals
 
-import json
+import time
 
 import mock
 from marshmallow import fields
 from nose.tools import assert_raises
 from requests import Response, codes
 
+from prospyr.cache import InMemoryCache
 from prospyr.connection import connect
-from prospyr.exceptions import ValidationError
+from prospyr.exceptions import ApiError, ValidationError
 from prospyr.resources import Resource
 from prospyr.search import ActivityTypeListSet, ListSet, ResultSet
-from tests import load_fixture_json, reset_conns
+from tests import json_to_resp, load_fixture_json, reset_conns
 
 
 class MockManager(object):
@@ -70,13 +71,6 @@ class IdResource(Resource):
     id = fields.Integer()
 
 
-def json_to_resp(data, status_code=codes.ok):
-    resp = Response()
-    resp._content = json.dumps(data).encode('utf-8')
-    resp.status_code = status_code
-    return resp
-
-
 @reset_conns
 def test_iterable():
     """
@@ -112,6 +106,22 @@ def test_finish_on_small_page():
     assert {r.id for r in rs} == {1, 2, 3}
 
 
+@reset_conns
+def test_deadline_stops_iteration():
+    def pages(*args, **kwargs):
+        yield json_to_resp([{'id': 1}, {'id': 2}])
+        time.sleep(0.02)
+        yield json_to_resp([{'id': 3}, {'id': 4}])
+        raise Exception('ResultSet queried after the deadline')
+
+    cn = connect(email='foo', token='bar')
+    cn.session.post = mock.Mock(side_effect=pages())
+    rs = ResultSet(resource_cls=IdResource, page_size=2).deadline(0.01)
+    assert [r.id for r in rs] == [1, 2, 3, 4]
+    assert rs.partial
+    assert not ResultSet(resource_cls=IdResource).partial
+
+
 @reset_conns
 def test_last_page_is_exactly_page_size():
     """
@@ -198,6 +208,7 @@ def test_cannot_order_listset():
     assert any('ordering' in arg for arg in cm.exception.args)
 
 
+@reset_conns
 def test_activitytype_listset():
     connect(email='foo', token='bar')
     atls = ActivityTypeListSet()
@@ -231,3 +242,98 @@ def test_storing_invalid_resources():
     valid = list(ResultSet(resource_cls=IdResource).store_invalid(invalid))
     assert len(valid) == 1  # id 1 passed validation
     assert len(invalid) == 1  # id 'not-an-integer' didn't
+
+
+@reset_conns
+def test_search_pages_cached():
+    cn = connect(email='foo', token='bar', search_cache=InMemoryCache())
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1}]
+    ))
+    rs = ResultSet(resource_cls=IdResource, page_size=2)
+    assert [r.id for r in rs] == [1]
+    assert [r.id for r in rs.filter()] == [1]
+    assert cn.session.post.call_count == 1
+
+    # argument order does not matter
+    list(rs.filter(a=1, b=2))
+    list(rs.filter(b=2).filter(a=1))
+    assert cn.session.post.call_count == 2
+
+    # errors are not cached
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        {}, status_code=codes.server_error
+    ))
+    for _ in range(2):
+        with assert_raises(ApiError):
+            list(rs.filter(c=3))
+    assert cn.session.post.call_count == 2
+
+
+@reset_conns
+def test_search_cache_invalidated():
+    cn = connect(email='foo', token='bar', search_cache=InMemoryCache())
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1}]
+    ))
+    rs = ResultSet(resource_cls=IdResource, page_size=2)
+    list(rs)
+    cn.invalidate_search(cn.build_absolute_url('foo'))
+    list(rs.filter())
+    assert cn.session.post.call_count == 2
+
+
+@reset_conns
+def test_search_generation_kept_while_used():
+    cn = connect(email='foo', token='bar',
+                 search_cache=InMemoryCache(size=10))
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1}]
+    ))
+    rs = ResultSet(resource_cls=IdResource, page_size=2)
+    for round in range(60):
+        list(rs.filter(hot=True))
+        list(rs.filter(cold=round))
+    # each cold query once, and the hot query only the first time
+    assert cn.session.post.call_count == 60 + 1
+
+
+@reset_conns
+def test_search_not_cached_by_default():
+    cn = connect(email='foo', token='bar')
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1}]
+    ))
+    rs = ResultSet(resource_cls=IdResource, page_size=2)
+    list(rs)
+    list(rs.filter())
+    assert cn.session.post.call_count == 2
+
+
+@reset_conns
+def test_search_cache_stats_count_pages_only():
+    cache = InMemoryCache()
+    cn = connect(email='foo', token='bar', search_cache=cache)
+    cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+        [{'id': 1}]
+    ))
+    list(ResultSet(resource_cls=IdResource, page_size=2))
+    list(ResultSet(resource_cls=IdResource, page_size=2))
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+@reset_conns
+def test_streamed_pages():
+    def pages(*args, **kwargs):
+        yield json_to_resp([{'id': 1}, {'id': 2}])
+        yield json_to_resp([{'id': 3}, {'id': 'not-an-integer'}])
+
+    cn = connect(email='foo', token='bar', search_cache=InMemoryCache())
+    cn.session.post = mock.Mock(side_effect=pages())
+    results = iter(ResultSet(resource_cls=IdResource, page_size=2).stream())
+    assert [next(results).id for _ in range(3)] == [1, 2, 3]
+    with assert_raises(ValidationError):
+        next(results)
+    assert cn.session.post.call_args[1]['stream'] is True
+    assert cn.search_cache.stats()['misses'] == 0
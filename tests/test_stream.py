@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_raises
+
+import prospyr
+from prospyr import stream
+from prospyr.search import ResultSet
+from prospyr.testing.fake import FakeProsperWorks
+from tests import reset_conns
+
+rows = [
+    {'id': 1, 'name': 'Zoë', 'details': 'a, b ] c'},
+    {'id': 22, 'value': 12345, 'nested': [{'x': [1, 2]}, None, 1.5]},
+    [],
+    -1.25e3,
+    'end',
+]
+body = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_decoded_items():
+    # every chunk size splits items, numbers and characters differently
+    for size in range(1, 20):
+        items = list(stream.iter_items(chunked(body, size), use_ijson=False))
+        assert items == rows, size
+    assert list(stream.iter_items([b' [ ] '], use_ijson=False)) == []
+
+
+def test_decoded_items_invalid():
+    for data in (b'{"id": 1}', b'[{"id": 1}, {"id":', b'[1, 2', b''):
+        with assert_raises(ValueError):
+            list(stream.iter_items(chunked(data, 3), use_ijson=False))
+
+
+def test_ijson_items():
+    if stream.ijson is None:
+        raise SkipTest('ijson is not installed')
+    for size in (1, 7, len(body)):
+        items = list(stream.iter_items(chunked(body, size), use_ijson=True))
+        assert items == rows, size
+
+
+@reset_conns
+def test_stream_from_server():
+    with FakeProsperWorks(counts={'person': 45}) as fake:
+        prospyr.connect(email='foo', token='bar', url=fake.url)
+        people = ResultSet(resource_cls=prospyr.Person, page_size=20)
+        read = [p.id for p in people]
+        streamed = [p.id for p in people.stream()]
+    assert read == streamed == list(range(1, 46))
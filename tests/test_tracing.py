@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from contextlib import contextmanager
+
+import mock
+from marshmallow import fields
+
+from prospyr import tracing
+from prospyr.connection import connect
+from prospyr.fields import NestedIdentifiedResource
+from prospyr.resources import Resource
+from prospyr.search import ResultSet
+from tests import json_to_resp, reset_conns
+
+
+class Span(object):
+
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.ended = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def is_recording(self):
+        return True
+
+    def end(self):
+        self.ended = True
+
+
+class RecordingTracer(object):
+
+    def __init__(self):
+        self.spans = []
+        self.current = None
+
+    def start_span(self, name, attributes=None):
+        span = Span(name, attributes, self.current)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        span = self.start_span(name, attributes)
+        with self.use_span(span):
+            yield span
+        span.end()
+
+    @contextmanager
+    def use_span(self, span):
+        previous, self.current = self.current, span
+        try:
+            yield span
+        finally:
+            self.current = previous
+
+    def named(self, name):
+        return [span for span in self.spans if span.name == name]
+
+
+class TracedResource(Resource):
+    class Meta:
+        search_path = 'traced/search/'
+    id = fields.Integer()
+    parent = NestedIdentifiedResource(types={'person': 'tests.test_tracing.Parent'})  # noqa
+
+
+class Parent(Resource):
+    class Meta:
+        detail_path = 'parents/{id}/'
+    id = fields.Integer()
+
+
+@reset_conns
+def test_result_set_spans():
+    tracer = RecordingTracer()
+    tracing.set_tracer(tracer)
+    try:
+        cn = connect(email='foo', token='bar')
+        parent = {'type': 'person', 'id': 10}
+        cn.session.post = mock.Mock(side_effect=[
+            json_to_resp([{'id': 1, 'parent': parent},
+                          {'id': 2, 'parent': parent}]),
+            json_to_resp([{'id': 3, 'parent': parent}]),
+        ])
+        with mock.patch.object(Parent, 'objects') as objects:
+            objects.get.return_value = Parent(id=10)
+            rs = ResultSet(resource_cls=TracedResource, page_size=2)
+            assert [r.id for r in rs] == [1, 2, 3]
+    finally:
+        tracing.set_tracer(None)
+
+    root, = tracer.named('prospyr.ResultSet')
+    assert root.ended
+    assert root.parent is None
+    assert root.attributes == {'prospyr.resource': 'TracedResource',
+                               'prospyr.rows': 3, 'prospyr.pages': 2}
+
+    pages = tracer.named('prospyr.search_page')
+    assert [p.attributes['prospyr.page_number'] for p in pages] == [1, 2]
+    assert [p.attributes['prospyr.rows'] for p in pages] == [2, 1]
+    assert all(p.parent is root for p in pages)
+
+    decodes = tracer.named('prospyr.json_decode')
+    assert [d.parent for d in decodes] == pages
+    assert decodes[0].attributes['prospyr.bytes'] > 0
+
+    builds = tracer.named('prospyr.build_resources')
+    assert [b.attributes['prospyr.rows'] for b in builds] == [2, 1]
+    assert all(b.parent is root for b in builds)
+    assert all(b.ended for b in builds)
+
+    fetches = tracer.named('prospyr.nested_fetch')
+    assert [f.parent for f in fetches] == [builds[0], builds[0], builds[1]]
+    assert fetches[0].attributes == {'prospyr.resource': 'Parent',
+                                     'prospyr.id': 10}
+
+
+@reset_conns
+def test_rows_built_as_consumed():
+    tracer = RecordingTracer()
+    tracing.set_tracer(tracer)
+    try:
+        cn = connect(email='foo', token='bar')
+        cn.session.post = mock.Mock(side_effect=lambda *a, **kw: json_to_resp(
+            [{'id': id} for id in range(1, 101)]
+        ))
+        with mock.patch.object(TracedResource, 'from_api_data',
+                               wraps=TracedResource.from_api_data) as build:
+            rs = ResultSet(resource_cls=TracedResource, page_size=100)
+            assert rs[0].id == 1
+            assert build.call_count == 1
+    finally:
+        tracing.set_tracer(None)
+    build, = tracer.named('prospyr.build_resources')
+    assert build.attributes['prospyr.rows'] == 100
+
+
+def test_noop_tracer_by_default():
+    tracer = tracing.get_tracer()
+    assert isinstance(tracer, tracing.NoOpTracer)
+    with tracer.start_as_current_span('span') as span:
+        assert not span.is_recording()
+        span.set_attribute('key', 'value')
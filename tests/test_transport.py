@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+from functools import wraps
+
+from nose.tools import assert_raises
+
+import prospyr
+from prospyr.connection import _connections
+from prospyr.exceptions import UnrecordedRequest
+from prospyr.testing.fake import FakeProsperWorks
+from prospyr.transport import RecordingTransport, ReplayTransport
+from tests import reset_conns
+
+
+def in_tempdir(fn):
+    @wraps(fn)
+    def wrapped(*args, **kwargs):
+        path = tempfile.mkdtemp()
+        try:
+            fn(path, *args, **kwargs)
+        finally:
+            shutil.rmtree(path)
+    return wrapped
+
+
+def _activities():
+    return [(a.id, a.parent.id) for a in prospyr.Activity.objects.all()]
+
+
+@reset_conns
+@in_tempdir
+def test_record_replay(tmp):
+    path = os.path.join(tmp, 'activity.jsonl.gz')
+    with FakeProsperWorks(counts={'person': 3, 'activity': 5}) as fake:
+        with RecordingTransport(path) as recorder:
+            prospyr.connect(email='foo', token='bar', url=fake.url,
+                            transport=recorder)
+            recorded = _activities()
+    del _connections['default']
+
+    # no server is running now
+    prospyr.connect(email='foo', token='bar', transport=ReplayTransport(path))
+    assert _activities() == recorded
+
+    with assert_raises(UnrecordedRequest):
+        prospyr.Person.objects.get(id=99)
+
+
+@reset_conns
+@in_tempdir
+def test_replay_in_turn(tmp):
+    path = os.path.join(tmp, 'people.jsonl')
+    with FakeProsperWorks(counts={'person': 1}) as fake:
+        with RecordingTransport(path) as recorder:
+            conn = prospyr.connect(email='foo', token='bar', url=fake.url,
+                                   transport=recorder)
+            fake.fail_next(503)
+            url = conn.build_absolute_url('people/1/')
+            statuses = [conn.http_method('get', url).status_code
+                        for _ in range(2)]
+    assert statuses == [503, 200]
+
+    replay = ReplayTransport(path, timings=0.5)
+    conn = prospyr.connect(email='foo', token='bar', name='offline',
+                           transport=replay)
+    url = conn.build_absolute_url('people/1/')
+    statuses = [conn.http_method('get', url).status_code for _ in range(3)]
+    assert statuses == [503, 200, 200]
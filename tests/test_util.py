@@ -3,7 +3,7 @@ import sys
 from nose.tools import assert_raises
 
 from prospyr.util import (import_dotted_path, seconds, to_camel, to_kebab,
-                          to_snake)
+                          to_snake, url_template)
 
 CONSTANT = 'foo'
 
@@ -39,3 +39,13 @@ def test_import_dotted_path():
 
     with assert_raises(ImportError):
         import_dotted_path('ohsdfojhsdf.sdfosdhkjshdfsdf.sdfohsdjohsdf')
+
+
+def test_url_template():
+    base = 'https://api.prosperworks.com/developer_api/v1/'
+    assert url_template(base + 'people/1/') == 'people/{id}/'
+    assert url_template(base + 'leads/22') == 'leads/{id}'
+    assert url_template(base + 'people/search/') == 'people/search/'
+    assert url_template(base + 'people/search/#abc#{}') == 'people/search/'
+    assert url_template(base + 'pipeline_stages') == 'pipeline_stages'
+    assert url_template('people/1/?q=2') == 'people/{id}/'
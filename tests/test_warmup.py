@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import os
+import tempfile
+
+import mock
+
+from prospyr.cache import NoOpCache
+from prospyr.connection import connect
+from prospyr.resources import ActivityType, LossReason, User
+from prospyr.warmup import warm
+from tests import json_to_resp, reset_conns
+
+
+def mock_session_get(cn):
+    lists = {
+        cn.build_absolute_url('loss_reasons'): [{'id': 1, 'name': 'Price'}],
+        cn.build_absolute_url('users/'): [
+            {'id': 2, 'name': 'Jon', 'email': 'jon@example.org'}
+        ],
+    }
+
+    def get(url, *args, **kwargs):
+        return json_to_resp(lists[url])
+    cn.session.get = mock.Mock(side_effect=get)
+
+
+@reset_conns
+def test_warm():
+    cn = connect(email='foo', token='bar')
+    mock_session_get(cn)
+    warmed = warm(cn, resources=[LossReason, User])
+    assert warmed[LossReason][1].name == 'Price'
+    assert warmed[User][2].name == 'Jon'
+    assert cn.session.get.call_count == 2
+
+    # later lookups need no requests
+    assert User.objects.get(id=2).name == 'Jon'
+    assert LossReason.objects.get(id=1).name == 'Price'
+    assert cn.session.get.call_count == 2
+
+
+@reset_conns
+def test_warm_from_snapshot():
+    snapshot = os.path.join(tempfile.mkdtemp(), 'snapshot.json')
+    cn = connect(email='foo', token='bar', name='first')
+    mock_session_get(cn)
+    warm(cn, resources=[LossReason, User], snapshot=snapshot)
+    assert os.path.exists(snapshot)
+
+    # a fresh connection can warm from the snapshot alone
+    cn = connect(email='foo', token='bar', name='second')
+    mock_session_get(cn)
+    warmed = warm(cn, resources=[LossReason, User], snapshot=snapshot)
+    assert warmed[User][2].name == 'Jon'
+    assert not cn.session.get.called
+
+    # but not one with another account
+    cn = connect(email='baz', token='bar', name='third')
+    mock_session_get(cn)
+    warm(cn, resources=[LossReason, User], snapshot=snapshot)
+    assert cn.session.get.call_count == 2
+
+    # nor once the snapshot is too old
+    cn = connect(email='foo', token='bar', name='fourth')
+    mock_session_get(cn)
+    warm(cn, resources=[User], snapshot=snapshot, snapshot_max_age=0)
+    assert cn.session.get.call_count == 1
+
+
+@reset_conns
+def test_warm_without_url_cache():
+    snapshot = os.path.join(tempfile.mkdtemp(), 'snapshot.json')
+    cn = connect(email='foo', token='bar', name='first', cache=NoOpCache())
+    mock_session_get(cn)
+    warmed = warm(cn, resources=[LossReason, User], snapshot=snapshot)
+    assert warmed[User][2].name == 'Jon'
+    assert cn.session.get.call_count == 2
+    assert User.objects.use('first').get(id=2).name == 'Jon'
+    assert cn.session.get.call_count == 2
+
+    cn = connect(email='foo', token='bar', name='second', cache=NoOpCache())
+    mock_session_get(cn)
+    warm(cn, resources=[LossReason, User], snapshot=snapshot)
+    assert LossReason.objects.use('second').get(id=1).name == 'Price'
+    assert not cn.session.get.called
+
+
+@reset_conns
+def test_warm_activity_types():
+    cn = connect(email='foo', token='bar', cache=NoOpCache())
+    cn.session.get = mock.Mock(return_value=json_to_resp({
+        'user': [{'id': 1, 'category': 'user', 'name': 'Call'}],
+        'system': [{'id': 2, 'category': 'system', 'name': 'Note'}],
+    }))
+    warmed = warm(cn, resources=[ActivityType])
+    assert sorted(warmed[ActivityType]) == [1, 2]
+    assert cn.session.get.call_count == 1